@@ -10,7 +10,9 @@ build_exe_options = {
                  "ollama",
                  "backoff",
                  "requests",
+                 "aiohttp",
                  "bs4",
+                 "lxml",
                  "selenium",
                  "webdriver_manager",
                  "streamlit",
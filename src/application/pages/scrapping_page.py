@@ -4,7 +4,6 @@ import threading
 import time
 import streamlit as st
 
-from main import update_store_data
 from scraping.offer_cache import OfferCache
 
 
@@ -58,16 +57,18 @@ def scrapping_page():
                 "failed_scoring": 0,
             }
 
-        cache = OfferCache(cache_path)
+        # une lecture de status_counts (compteurs tenus par triggers), schéma vérifié une fois par process
+        with OfferCache(cache_path) as cache:
+            counts = cache.counts()
 
-        pending_scoring = cache.count_by_status("DETAILED")
-        pending_url = cache.count_by_status("PENDING_URL")
+        pending_scoring = counts.get("DETAILED", 0)
+        pending_url = counts.get("PENDING_URL", 0)
 
         # ✅ ACCEPTÉES : scorées "white" + whitelist (bootstrap)
-        accepted_scoring = cache.count_by_statuses(["SCORED_WHITE", "WHITE"])
+        accepted_scoring = counts.get("SCORED_WHITE", 0) + counts.get("WHITE", 0)
 
         # ❌ REFUSÉES : scorées "black" + blacklist (bootstrap)
-        failed_scoring = cache.count_by_statuses(["SCORED_BLACK", "BLACK"])
+        failed_scoring = counts.get("SCORED_BLACK", 0) + counts.get("BLACK", 0)
 
         return {
             "accepted_scoring": int(accepted_scoring),
@@ -85,9 +86,9 @@ def scrapping_page():
                 "Linkedin": (0, 1, 0, 1),
                 "Apec": (0, 1, 0, 1),
                 "ServicePublic": (0, 1, 0, 1),
-                "Reprise détail (URL)": (0, 1),
-                "Reprise scoring (cache)": (0, 1),
-                "Traitement des nouvelles offres (LLM)": (0, 1),
+                "Pipeline : détail (URL)": (0, 1),
+                "Pipeline : scoring LLM": (0, 1),
+                "Pipeline : persistance": (0, 1),
                 "_ui_counts": _read_ui_counts(profile_id),
             }
             st.session_state._bar_keys = []
@@ -234,6 +235,9 @@ def scrapping_page():
         result_container = {}
 
         def run(progress_dict):
+            # import au lancement : scrapers, moteur HTTP et SDK LLM ne pèsent pas sur chaque rerun Streamlit
+            from main import update_store_data
+
             success, error_msg = update_store_data(progress_dict)
             result_container["success"] = success
             result_container["error"] = error_msg
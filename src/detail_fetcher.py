@@ -1,23 +1,34 @@
-from scraping.WelcomeToTheJungle import WelcomeToTheJungle
-from scraping.Apec import Apec
-from scraping.Linkedin import Linkedin
-from scraping.ServicePublic import ServicePublic
+import importlib
+import threading
 
+from scraping.config import read_config
 
+
+# source -> classe du scraper (module scraping.<classe>), importée à la première utilisation :
+# selenium, dateparser… ne sont chargés que pour les sources réellement scrapées
 SCRAPER_BY_SOURCE = {
-    "wttj": WelcomeToTheJungle,
-    "apec": Apec,
-    "linkedin": Linkedin,
-    "sp": ServicePublic,
+    "wttj": "WelcomeToTheJungle",
+    "apec": "Apec",
+    "linkedin": "Linkedin",
+    "sp": "ServicePublic",
 }
 
 
+def scraper_class(source: str):
+    """Classe du scraper d'une source (import paresseux), None si la source est inconnue."""
+    name = SCRAPER_BY_SOURCE.get((source or "").lower())
+    if not name:
+        return None
+    return getattr(importlib.import_module(f"scraping.{name}"), name)
+
+
 def fetch_detail_by_source(source: str, url: str) -> dict | None:
     """
     Appelle fetch_detail(url) du bon scraper.
+    Les sources Selenium (Apec, WTTJ) empruntent un driver du pool partagé
+    au lieu de lancer un Chrome par offre.
     """
-    source = (source or "").lower()
-    cls = SCRAPER_BY_SOURCE.get(source)
+    cls = scraper_class(source)
     if not cls:
         return None
 
@@ -29,3 +40,87 @@ def fetch_detail_by_source(source: str, url: str) -> dict | None:
         return scraper.fetch_detail(url)
     except Exception:
         return None
+
+
+# ==========================
+# REPRISE PAR LOT (PENDING_URL -> DETAILED)
+# ==========================
+DEFAULT_SOURCE_CONCURRENCY = 8
+
+
+def _read_resume_concurrency() -> dict:
+    config = read_config()
+    return config.get("resume_concurrency") or {}
+
+
+class SourceDetailer:
+    """
+    Détail d'offres PENDING_URL, toutes sources confondues, appelable depuis plusieurs threads.
+
+    - un seul scraper par source (créé à la première offre : config lue une fois,
+      moteur HTTP / pool de drivers partagés)
+    - concurrence bornée par source (config "resume_concurrency", sémaphore par source)
+    - detail(offer) => ligne {"offer_id", "source", "link", "title", "content"} passée en DETAILED,
+      ou None (offre marquée ERROR_DETAIL)
+    """
+
+    def __init__(self, cache, concurrency: dict | None = None):
+        self.cache = cache
+        self.concurrency = {**_read_resume_concurrency(), **(concurrency or {})}
+        self._scrapers = {}
+        self._slots = {}
+        self._lock = threading.Lock()
+
+    def limit(self, source: str) -> int:
+        return max(1, int(self.concurrency.get(source, DEFAULT_SOURCE_CONCURRENCY) or 1))
+
+    def _scraper(self, source: str):
+        with self._lock:
+            if source not in self._scrapers:
+                try:
+                    self._scrapers[source] = scraper_class(source)()
+                except Exception as e:
+                    print(f"[RESUME] {source} ignoré : {e}")
+                    self._scrapers[source] = None
+                self._slots[source] = threading.BoundedSemaphore(self.limit(source))
+            return self._scrapers[source], self._slots[source]
+
+    def detail(self, offer: dict) -> dict | None:
+        offer_id = offer.get("offer_id", "")
+        source = (offer.get("source", "") or "").lower()
+        url = offer.get("url", "") or ""
+        if not offer_id or not url or source not in SCRAPER_BY_SOURCE:
+            if offer_id:
+                self.cache.mark_error(offer_id, status="ERROR_DETAIL")
+            return None
+
+        scraper, slots = self._scraper(source)
+        data = None
+        if scraper is not None:
+            with slots:
+                try:
+                    data = scraper.fetch_detail(url)
+                except Exception:
+                    data = None
+
+        title = ((data or {}).get("title") or "").strip()
+        desc = ((data or {}).get("description") or "").strip()
+        if not title or not desc:
+            self.cache.mark_error(offer_id, status="ERROR_DETAIL")
+            return None
+
+        self.cache.upsert_detail(
+            offer_id=offer_id,
+            source=source,
+            url=url,
+            title=title,
+            description=desc,
+            status="DETAILED",
+        )
+        return {
+            "offer_id": offer_id,
+            "source": source,
+            "link": url,
+            "title": title,
+            "content": desc,
+        }
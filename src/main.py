@@ -2,20 +2,21 @@ import os
 import json
 import csv
 import traceback
+import queue
+import threading
 from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
-from openai import OpenAI
-from mistralai import Mistral
 
-from scraping.WelcomeToTheJungle import WelcomeToTheJungle
-from scraping.Apec import Apec
-from scraping.Linkedin import Linkedin
-from scraping.ServicePublic import ServicePublic
 from scraping.utils import measure_time, add_LLM_comment, SCORE_THRESHOLD
 from scraping.offer_cache import OfferCache
+from scraping.driver_pool import close_driver_pool
+from scraping.http_engine import get_http_engine, close_http_engine
+from scraping.rate_limiter import close_rate_limiter
+from scraping.response_store import replay_into_cache
 
-from detail_fetcher import fetch_detail_by_source
+from detail_fetcher import SourceDetailer, scraper_class
+from pipeline import Pipeline, Stage
 
 
 def _to_bool(v):
@@ -69,9 +70,14 @@ def _init_llm_client(config):
 
     if use_llm:
         provider = llm_config.get("provider")
+        # SDK importés seulement pour le fournisseur choisi (démarrage de l'app plus rapide)
         if provider == "ChatGPT":
+            from openai import OpenAI
+
             client = OpenAI(api_key=llm_config.get("gpt_api_key"))
         elif provider == "Mistral":
+            from mistralai import Mistral
+
             client = Mistral(api_key=llm_config.get("mistral_api_key"))
         elif provider == "Local":
             client = None
@@ -117,109 +123,118 @@ def _row_from_cache_offer(o: dict):
     }
 
 
-def _resume_pending_details(cache: OfferCache, limit: int = 200, on_tick=None):
-    pendings = cache.list_by_status("PENDING_URL", limit=limit)
-    detailed_rows = []
+def _platform_progress_callback(progress_dict, name: str):
+    def update_callback(*args):
+        if not args:
+            return
+        if len(args) >= 4:
+            offers_current, offers_total, pages_current, pages_total = args[:4]
+            progress_dict[name] = (
+                int(offers_current),
+                int(offers_total) if int(offers_total) > 0 else max(int(offers_current), 1),
+                int(pages_current),
+                int(pages_total) if int(pages_total) > 0 else max(int(pages_current), 1),
+            )
+        else:
+            current, total = args[:2]
+            progress_dict[name] = (
+                int(current),
+                int(total) if int(total) > 0 else max(int(current), 1),
+            )
 
-    for idx, o in enumerate(pendings, start=1):
-        offer_id = o.get("offer_id", "")
-        source = (o.get("source", "") or "").lower()
-        url = o.get("url", "") or ""
+    return update_callback
 
-        if not offer_id or not url:
-            if offer_id:
-                cache.mark_error(offer_id, status="ERROR_DETAIL")
-            if on_tick:
-                on_tick(idx)
-            continue
-
-        data = fetch_detail_by_source(source, url)
-        if not data:
-            cache.mark_error(offer_id, status="ERROR_DETAIL")
-            if on_tick:
-                on_tick(idx)
-            continue
-
-        title = (data.get("title") or "").strip()
-        desc = (data.get("description") or "").strip()
-
-        if not title or not desc:
-            cache.mark_error(offer_id, status="ERROR_DETAIL")
-            if on_tick:
-                on_tick(idx)
-            continue
-
-        cache.upsert_detail(
-            offer_id=offer_id,
-            source=source,
-            url=url,
-            title=title,
-            description=desc,
-            status="DETAILED",
-        )
 
-        detailed_rows.append({
-            "offer_id": offer_id,
-            "source": source,
-            "link": url,
-            "title": title,
-            "content": desc,
-        })
+@measure_time
+def get_all_job(progress_dict, all_platforms, is_multiproc, cache=None, profile_id: str = ""):
+    results = list(iter_all_jobs(progress_dict, all_platforms, is_multiproc, cache=cache, profile_id=profile_id))
+    if not results:
+        return pd.DataFrame(columns=["title", "content", "company", "link", "date", "hash", "source", "offer_id"])
+    return pd.concat(results, ignore_index=True)
 
-        if on_tick:
-            on_tick(idx)
 
-    return detailed_rows
+def iter_all_jobs(
+    progress_dict, all_platforms, is_multiproc, cache=None, profile_id: str = "", queue_size: int = 8, errors=None
+):
+    """
+    Génère les petits DataFrames d'offres détaillées de toutes les plateformes, au fil de l'eau.
+    En multi-thread, chaque plateforme tourne dans son thread et alimente une queue bornée
+    (backpressure : un scraper attend si le scoring prend du retard).
 
+    Même comportement en séquentiel et en multi-thread : une plateforme en erreur est loguée et
+    n'arrête pas les autres ; les erreurs ("<plateforme> : <message>") sont ajoutées à `errors`
+    si fourni, sinon levées (RuntimeError) une fois toutes les plateformes terminées.
+    """
+    failures = errors if errors is not None else []
 
-@measure_time
-def get_all_job(progress_dict, all_platforms, is_multiproc, cache=None, profile_id: str = ""):
     def run_source(source_class):
         name = source_class.__name__
         print(f"[SCRAP] Démarrage {name}")
-        platform = source_class()
-
-        def update_callback(*args):
-            if not args:
-                return
-            if len(args) >= 4:
-                offers_current, offers_total, pages_current, pages_total = args[:4]
-                progress_dict[name] = (
-                    int(offers_current),
-                    int(offers_total) if int(offers_total) > 0 else max(int(offers_current), 1),
-                    int(pages_current),
-                    int(pages_total) if int(pages_total) > 0 else max(int(pages_current), 1),
-                )
-            else:
-                current, total = args[:2]
-                progress_dict[name] = (
-                    int(current),
-                    int(total) if int(total) > 0 else max(int(current), 1),
-                )
-
         try:
-            df = platform.getJob(update_callback=update_callback, cache=cache, profile_id=profile_id)
-        except TypeError:
-            df = platform.getJob(update_callback=update_callback)
-
+            platform = source_class()
+            yield from platform.iterJob(
+                update_callback=_platform_progress_callback(progress_dict, name),
+                cache=cache,
+                profile_id=profile_id,
+            )
+        except Exception as e:
+            traceback.print_exc()
+            failures.append(f"{name} : {e}")
+            return
         print(f"[SCRAP] Fin {name}")
-        return df
 
-    if is_multiproc and len(all_platforms) > 1:
-        print(f"[SCRAP] Mode multi-thread ({len(all_platforms)} workers)")
-        with ThreadPoolExecutor(max_workers=len(all_platforms)) as executor:
-            results = list(executor.map(run_source, all_platforms))
-    else:
+    def _raise_failures():
+        if errors is None and failures:
+            raise RuntimeError("Échec du scraping : " + " ; ".join(failures))
+
+    if not (is_multiproc and len(all_platforms) > 1):
         print("[SCRAP] Mode séquentiel")
-        results = [run_source(cls) for cls in all_platforms]
+        for cls in all_platforms:
+            yield from run_source(cls)
+        _raise_failures()
+        return
 
-    if not results:
-        return pd.DataFrame(columns=["title", "content", "company", "link", "date", "hash", "source", "offer_id"])
-    return pd.concat(results, ignore_index=True)
+    print(f"[SCRAP] Mode multi-thread ({len(all_platforms)} workers)")
+    out_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    end_of_source = object()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out_q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _pump(cls):
+        try:
+            for df in run_source(cls):
+                if not _put(df):
+                    return
+        finally:
+            _put(end_of_source)
+
+    with ThreadPoolExecutor(max_workers=len(all_platforms)) as executor:
+        for cls in all_platforms:
+            executor.submit(_pump, cls)
+        remaining = len(all_platforms)
+        try:
+            while remaining:
+                item = out_q.get()
+                if item is end_of_source:
+                    remaining -= 1
+                    continue
+                yield item
+        finally:
+            stop.set()
+    _raise_failures()
 
 
 @measure_time
 def update_store_data(progress_dict):
+    cache = None
     try:
         def ui_log(role: str, msg: str):
             if not role or not msg:
@@ -242,6 +257,12 @@ def update_store_data(progress_dict):
 
         cache_path = os.path.join("data", f"cache_{profile_id}.sqlite")
         cache = OfferCache(cache_path)
+        # écritures des scrapers / étapes déposées dans la queue d'un thread d'écriture unique
+        cache.start_writer(
+            max_queue=int(config.get("cache_write_queue", 2000) or 2000),
+            batch_size=int(config.get("cache_write_batch", 200) or 200),
+            interval=float(config.get("cache_write_interval", 0.2) or 0.2),
+        )
 
         # >>> ROLLBACK : annule les faux refus (SCORED_BLACK score=0/is_good=0)
         rolled = cache.rollback_scoring_black_to_detailed()
@@ -250,12 +271,13 @@ def update_store_data(progress_dict):
             print(f"[ROLLBACK] {rolled} offres repassées en DETAILED (scoring KO).")
 
         def _push_ui_counts():
-            pending_scoring = cache.count_by_status("DETAILED")
-            pending_url = cache.count_by_status("PENDING_URL")
-            existing_treated = cache.count_by_statuses(
-                ["SCORED_WHITE", "SCORED_BLACK", "WHITE", "BLACK", "KNOWN"]
+            counts = cache.counts()
+            pending_scoring = counts.get("DETAILED", 0)
+            pending_url = counts.get("PENDING_URL", 0)
+            existing_treated = sum(
+                counts.get(s, 0) for s in ("SCORED_WHITE", "SCORED_BLACK", "WHITE", "BLACK", "KNOWN")
             )
-            failed_scoring = cache.count_by_statuses(["SCORED_BLACK", "BLACK"])
+            failed_scoring = counts.get("SCORED_BLACK", 0) + counts.get("BLACK", 0)
             progress_dict["_ui_counts"] = {
                 "existing_treated": int(existing_treated),
                 "pending_scoring": int(pending_scoring),
@@ -267,16 +289,25 @@ def update_store_data(progress_dict):
 
         launch_scrap = config.get("launch_scrap", {})
         active_platforms = []
-        if _to_bool(launch_scrap.get("wttj", False)):
-            active_platforms.append(WelcomeToTheJungle)
-        if _to_bool(launch_scrap.get("linkedin", False)):
-            active_platforms.append(Linkedin)
-        if _to_bool(launch_scrap.get("apec", False)):
-            active_platforms.append(Apec)
-        if _to_bool(launch_scrap.get("sp", False)):
-            active_platforms.append(ServicePublic)
-
-        if not active_platforms:
+        # ordre historique : wttj, linkedin, apec, sp ; chaque scraper n'est importé que s'il est lancé
+        for key in ("wttj", "linkedin", "apec", "sp"):
+            if _to_bool(launch_scrap.get(key, False)):
+                active_platforms.append(scraper_class(key))
+
+        # Mode replay : pas de réseau, on ré-extrait les offres depuis le HTML archivé
+        replay_mode = _to_bool(config.get("http_replay", False))
+        http_store = get_http_engine().store
+        if http_store is not None and not replay_mode:
+            try:
+                evicted = http_store.evict(int(config.get("http_cache_max_age_days", 30)) * 86400)
+                if evicted:
+                    print(f"[HTTP] {evicted} réponses archivées expirées supprimées.")
+            except Exception as e:
+                print(f"[HTTP] Eviction archive ignorée : {e}")
+
+        if replay_mode:
+            active_platforms = []
+        elif not active_platforms:
             ui_log("WARN", "Aucune plateforme sélectionnée.")
             print("[SCRAP] Aucune plateforme sélectionnée, rien à faire.")
             return True, ""
@@ -289,8 +320,10 @@ def update_store_data(progress_dict):
             try:
                 df_known = pd.read_csv(data_file, sep=";", encoding="utf-8")
                 if "offer_id" in df_known.columns and "link" in df_known.columns:
-                    for _, r in df_known[["offer_id", "link"]].dropna().iterrows():
-                        cache.upsert_url(str(r["offer_id"]), "known", str(r["link"]), "KNOWN")
+                    known_rows = df_known[["offer_id", "link"]].dropna().astype(str)
+                    cache.upsert_urls_many(
+                        (oid, "known", link, "KNOWN") for oid, link in zip(known_rows["offer_id"], known_rows["link"])
+                    )
                 ui_log("INFO", "Bootstrap CSV -> cache (KNOWN) OK.")
             except Exception as e:
                 ui_log("WARN", f"Bootstrap CSV ignoré: {e}")
@@ -310,171 +343,183 @@ def update_store_data(progress_dict):
             ui_log("WARN", f"Bootstrap listes ignoré: {e}")
             print(f"[CACHE] bootstrap listes ignoré : {e}")
 
+        # IDs connus chargés une fois : le dédoublonnage des listings se fait ensuite en mémoire
+        cache.flush()
+        known_ids = cache.preload_known_ids()
+        print(f"[CACHE] {known_ids} offres connues chargées en mémoire.")
+
         _push_ui_counts()
 
         use_llm, llm_config, client = _init_llm_client(config)
         ui_log("INFO", f"LLM: {'ON' if use_llm else 'OFF'}.")
 
-        # 0) Reprise PENDING_URL
-        resume_pending_limit = int(config.get("resume_pending_limit", 200))
-        progress_dict["Reprise détail (URL)"] = (0, max(resume_pending_limit, 1))
-        ui_log("STEP", "Reprise détail (PENDING_URL) -> DETAILED…")
-
-        def _on_pending_tick(i):
-            progress_dict["Reprise détail (URL)"] = (
-                i,
-                max(len(cache.list_by_status("PENDING_URL", limit=resume_pending_limit)), 1),
-            )
-            _push_ui_counts()
-
-        pending_rows = _resume_pending_details(cache, limit=resume_pending_limit, on_tick=_on_pending_tick)
-        if pending_rows:
-            ui_log("INFO", f"{len(pending_rows)} offres détaillées depuis PENDING_URL.")
-            print(f"[RESUME] {len(pending_rows)} offres PENDING_URL détaillées.")
-        else:
-            ui_log("INFO", "Aucune offre PENDING_URL à détailler.")
-        _push_ui_counts()
-
-        # 1) Reprise scoring DETAILED
-        resumed = cache.list_not_scored(limit=int(config.get("resume_limit", 1000)))
-        kept_rows_resume = []
-
-        if resumed:
-            ui_log("STEP", f"Reprise scoring cache ({len(resumed)} offres)…")
-            print(f"[RESUME] {len(resumed)} offres DETAILED à scorer.")
-            progress_dict["Reprise scoring (cache)"] = (0, len(resumed))
-
-            for i, o in enumerate(resumed, start=1):
-                row = _row_from_cache_offer(o)
-                offer_id = row.get("offer_id", "")
-                src = (row.get("source", "") or "").lower()
-
-                if not row.get("content", "").strip():
-                    if offer_id:
-                        cache.mark_error(offer_id, status="ERROR_DETAIL")
-                    progress_dict["Reprise scoring (cache)"] = (i, len(resumed))
-                    _push_ui_counts()
-                    continue
-
-                if use_llm:
-                    row = add_LLM_comment(client, llm_config, row)
-
-                score = int(row.get("score", 0) or 0)
-                is_good = int(row.get("is_good_offer", 0) or 0)
-
-                # >>> SI score=-1 (non scoré), on NE CHANGE PAS le status (reste DETAILED)
-                if score < 0:
-                    progress_dict["Reprise scoring (cache)"] = (i, len(resumed))
-                    if i % 3 == 0:
-                        _push_ui_counts()
-                    continue
-
-                _update_id_lists(config, platform_keys, src, offer_id, score, is_good)
-
-                status = _status_from_score(score, is_good)
-                if offer_id:
-                    cache.set_scoring(offer_id, score=score, is_good=is_good, status=status)
-
-                if not (is_good == 0 and score < SCORE_THRESHOLD):
-                    kept_rows_resume.append(row)
-
-                progress_dict["Reprise scoring (cache)"] = (i, len(resumed))
-                if i % 3 == 0:
-                    _push_ui_counts()
-
-            _append_rows_csv(kept_rows_resume, data_file)
-            ui_log("INFO", f"Reprise scoring OK (kept={len(kept_rows_resume)}).")
-            print(f"[RESUME] kept={len(kept_rows_resume)}")
+        # 0) Replay hors-ligne depuis l'archive HTML (remplace la reprise PENDING_URL)
+        if replay_mode:
+            ui_log("STEP", "Replay hors-ligne de l'archive HTML -> DETAILED…")
+            replayed = replay_into_cache(cache, http_store) if http_store is not None else 0
+            ui_log("INFO", f"Replay : {replayed} offres ré-extraites.")
+            print(f"[REPLAY] {replayed} offres ré-extraites depuis l'archive.")
             _push_ui_counts()
-        else:
-            ui_log("INFO", "Aucune offre en reprise scoring (cache).")
-
-        # 2) Scraping
-        ui_log("STEP", "Scraping des plateformes…")
-        new_df = get_all_job(
-            progress_dict,
-            active_platforms,
-            config.get("use_multithreading", False),
-            cache=cache,
-            profile_id=profile_id,
-        )
-
-        _push_ui_counts()
-
-        if new_df is None or new_df.empty:
-            ui_log("INFO", "Aucune nouvelle offre.")
-            print("[SCRAP] Aucune nouvelle offre.")
-            with open(config_file, "w", encoding="utf-8") as f:
-                json.dump(config, f, ensure_ascii=False, indent=2)
-            return True, ""
-
-        if "content" in new_df.columns:
-            new_df["content"] = new_df["content"].fillna("").astype(str)
-        else:
-            new_df["content"] = ""
 
-        # 3) Streaming scoring nouvelles offres
-        kept_rows = []
-        total = len(new_df)
-        progress_dict["Traitement des nouvelles offres (LLM)"] = (0, total)
-        ui_log("STEP", f"Traitement des nouvelles offres ({total})…")
-
-        for i, row in enumerate(new_df.to_dict(orient="records"), start=1):
+        # 1) Pipeline par étapes (statuts OfferCache) : détail -> scoring LLM -> persistance
+        #    reliées par des queues bornées ; réseau et LLM travaillent en même temps
+        final_statuses = {"BLACK", "WHITE", "SCORED_WHITE", "SCORED_BLACK", "KNOWN"}
+        detailer = SourceDetailer(cache)
+        csv_buffer = []
+        scoring_buffer = []
+        kept_count = [0]  # compteur seul : les lignes persistées ne restent pas en mémoire
+        csv_flush_rows = max(1, int(config.get("csv_flush_rows", 20) or 20))
+
+        def _stage_detail(offer):
+            # PENDING_URL -> DETAILED
+            return detailer.detail(offer)
+
+        def _stage_scoring(row):
+            # DETAILED -> ligne scorée (None : rien à persister, l'offre reste DETAILED)
             offer_id = str(row.get("offer_id") or "").strip()
-            src = (row.get("source", "") or "").lower()
-
-            if offer_id:
-                stt = cache.get_status(offer_id)
-                if stt in {"BLACK", "WHITE", "SCORED_WHITE", "SCORED_BLACK", "KNOWN"}:
-                    progress_dict["Traitement des nouvelles offres (LLM)"] = (i, total)
-                    continue
+            if offer_id and cache.get_status(offer_id) in final_statuses:
+                return None
 
-            if not str(row.get("content", "")).strip():
+            if not str(row.get("content", "") or "").strip():
                 if offer_id:
                     cache.mark_error(offer_id, status="ERROR_DETAIL")
-                progress_dict["Traitement des nouvelles offres (LLM)"] = (i, total)
-                _push_ui_counts()
-                continue
+                return None
 
             if use_llm:
                 row = add_LLM_comment(client, llm_config, row)
 
+            # >>> SI score=-1 (non scoré), on NE CHANGE PAS le status (reste DETAILED)
+            if int(row.get("score", 0) or 0) < 0:
+                return None
+            return row
+
+        def _flush():
+            # statuts SCORED_* (une transaction) puis lignes conservées dans le CSV
+            if scoring_buffer:
+                cache.set_scoring_many(scoring_buffer)
+                scoring_buffer.clear()
+                # durabilité : statuts commités avant l'écriture CSV (pas de doublon CSV après un crash)
+                cache.flush()
+            if csv_buffer:
+                _append_rows_csv(list(csv_buffer), data_file)
+                csv_buffer.clear()
+
+        def _stage_persist(row):
+            # ligne scorée -> SCORED_* (+ listes white/black + CSV) ; un seul worker (config / CSV)
+            offer_id = str(row.get("offer_id") or "").strip()
+            src = (row.get("source", "") or "").lower()
             score = int(row.get("score", 0) or 0)
             is_good = int(row.get("is_good_offer", 0) or 0)
 
-            # >>> SI score=-1 (non scoré), on laisse DETAILED et on n'append pas
-            if score < 0:
-                progress_dict["Traitement des nouvelles offres (LLM)"] = (i, total)
-                if i % 3 == 0:
-                    _push_ui_counts()
-                continue
-
             _update_id_lists(config, platform_keys, src, offer_id, score, is_good)
-
             if offer_id:
-                status = _status_from_score(score, is_good)
-                cache.set_scoring(offer_id, score=score, is_good=is_good, status=status)
+                scoring_buffer.append((offer_id, score, is_good, _status_from_score(score, is_good)))
 
             if not (is_good == 0 and score < SCORE_THRESHOLD):
-                kept_rows.append(row)
-
-            progress_dict["Traitement des nouvelles offres (LLM)"] = (i, total)
-            if i % 3 == 0:
+                kept_count[0] += 1
+                csv_buffer.append(row)
+            if len(scoring_buffer) >= csv_flush_rows or len(csv_buffer) >= csv_flush_rows:
+                _flush()
+            return None
+
+        stage_labels = {
+            "detail": "Pipeline : détail (URL)",
+            "scoring": "Pipeline : scoring LLM",
+            "persistence": "Pipeline : persistance",
+        }
+
+        def _on_stage_progress(name, m):
+            progress_dict[stage_labels[name]] = (m["done"], max(m["received"], 1))
+            if name == "persistence" and m["done"] % 10 == 0:
                 _push_ui_counts()
 
-        _append_rows_csv(kept_rows, data_file)
+        for label in stage_labels.values():
+            progress_dict[label] = (0, 1)
+
+        cache.flush()  # replay éventuel commité avant la reprise
+
+        # seules les PENDING_URL repris passent par l'étape détail (les scrapers détaillent eux-mêmes) :
+        # pas plus de threads que d'offres à reprendre
+        pending_limit = int(config.get("resume_pending_limit", 200))
+        pending_total = 0 if replay_mode else min(cache.count_by_status("PENDING_URL"), pending_limit)
+        detail_workers = max(1, min(sum(detailer.limit(k) for k in platform_keys), pending_total))
+
+        pipeline = Pipeline(
+            [
+                Stage("detail", _stage_detail, workers=detail_workers),
+                Stage("scoring", _stage_scoring, workers=int(config.get("llm_workers", 1) or 1)),
+                Stage("persistence", _stage_persist, workers=1, on_close=_flush),
+            ],
+            on_progress=_on_stage_progress,
+        ).start()
+
+        # une erreur pendant l'alimentation (scraper, cache) ne doit pas fermer moteur HTTP / drivers / cache
+        # sous les workers : le pipeline est arrêté puis vidé (lignes déjà scorées persistées) avant le finally
+        try:
+            # Reprise en flux (itération par clé : pas de liste de descriptions en mémoire).
+            # DETAILED puis PENDING_URL, entièrement injectées AVANT le scraping : le pipeline ne crée
+            # pas de nouvelles offres dans ces statuts pendant le parcours => aucune offre vue deux fois
+            resumed = 0
+            for o in cache.iter_by_status("DETAILED", limit=int(config.get("resume_limit", 1000))):
+                pipeline.feed(_row_from_cache_offer(o), stage="scoring")
+                resumed += 1
+            pending = 0
+            if not replay_mode:
+                for o in cache.iter_by_status(
+                    "PENDING_URL", limit=pending_limit, with_description=False
+                ):
+                    pipeline.feed(o, stage="detail")
+                    pending += 1
+            ui_log("STEP", f"Pipeline : {pending} PENDING_URL, {resumed} DETAILED en reprise…")
+
+            # 2) Scraping en flux : chaque lot d'offres détaillées part directement au scoring
+            new_count = 0
+            source_errors = []
+            if active_platforms:
+                ui_log("STEP", "Scraping des plateformes…")
+                for batch_df in iter_all_jobs(
+                    progress_dict,
+                    active_platforms,
+                    config.get("use_multithreading", False),
+                    cache=cache,
+                    profile_id=profile_id,
+                    errors=source_errors,
+                ):
+                    batch_df["content"] = batch_df["content"].fillna("").astype(str)
+                    for row in batch_df.to_dict(orient="records"):
+                        new_count += 1
+                        pipeline.feed(row, stage="scoring")
+        except BaseException:
+            pipeline.cancel()
+            raise
+        finally:
+            metrics = pipeline.close()
+
+        pipeline.log_metrics()
+        cache.flush()
         _push_ui_counts()
 
+        pending_detailed = metrics["detail"]["emitted"]
+        if pending_detailed:
+            ui_log("INFO", f"{pending_detailed} offres détaillées depuis PENDING_URL.")
+        if not new_count:
+            ui_log("INFO", "Aucune nouvelle offre.")
+            print("[SCRAP] Aucune nouvelle offre.")
+
         # 4) Save config
         with open(config_file, "w", encoding="utf-8") as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
 
-        ui_log("INFO", f"Terminé. New={len(new_df)} kept={len(kept_rows)}.")
+        ui_log("INFO", f"Terminé. New={new_count} kept={kept_count[0]}.")
         print(
-            f"[DONE] pending_detailed={len(pending_rows)} "
-            f"resumed={len(resumed)} kept_resume={len(kept_rows_resume)} "
-            f"new={len(new_df)} kept_new={len(kept_rows)}"
+            f"[DONE] pending_detailed={pending_detailed} "
+            f"resumed={resumed} new={new_count} kept={kept_count[0]}"
         )
+        if source_errors:
+            # offres des autres plateformes traitées et persistées ; le run est signalé en échec
+            message = "Échec du scraping : " + " ; ".join(source_errors)
+            ui_log("ERROR", message)
+            return False, message
         return True, ""
 
     except Exception as e:
@@ -485,6 +530,15 @@ def update_store_data(progress_dict):
             pass
         return False, str(e)
 
+    finally:
+        # libère les navigateurs du pool et le moteur HTTP entre deux runs
+        # (la config, dont le mode replay, est relue au run suivant)
+        close_driver_pool()
+        close_http_engine()
+        close_rate_limiter()
+        if cache is not None:
+            cache.close()
+
 
 if __name__ == "__main__":
     progress_dict = {
@@ -492,8 +546,8 @@ if __name__ == "__main__":
         "Linkedin": (0, 1),
         "Apec": (0, 1),
         "ServicePublic": (0, 1),
-        "Reprise détail (URL)": (0, 1),
-        "Reprise scoring (cache)": (0, 1),
-        "Traitement des nouvelles offres (LLM)": (0, 1),
+        "Pipeline : détail (URL)": (0, 1),
+        "Pipeline : scoring LLM": (0, 1),
+        "Pipeline : persistance": (0, 1),
     }
     update_store_data(progress_dict)
@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+import traceback
+
+
+class StageMetrics:
+    """Compteurs d'une étape (thread-safe) : entrées, sorties, erreurs, temps de travail cumulé."""
+
+    def __init__(self):
+        self.received = 0
+        self.done = 0
+        self.emitted = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add(self, **deltas) -> None:
+        with self._lock:
+            for k, v in deltas.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            elapsed = max(time.monotonic() - self.started_at, 1e-6)
+            return {
+                "received": self.received,
+                "done": self.done,
+                "emitted": self.emitted,
+                "errors": self.errors,
+                "per_second": round(self.done / elapsed, 2),
+                "busy_seconds": round(self.busy_seconds, 2),
+            }
+
+
+class Stage:
+    """
+    Étape du pipeline : `workers` threads appliquent func(item) aux éléments de sa queue bornée.
+    func renvoie un élément pour l'étape suivante, une liste d'éléments, ou None (rien à transmettre).
+    """
+
+    def __init__(self, name: str, func, workers: int = 1, queue_size: int = 100, on_close=None):
+        self.name = name
+        self.func = func
+        self.workers = max(1, int(workers))
+        self.queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self.on_close = on_close
+        self.metrics = StageMetrics()
+        self._threads = []
+
+
+_END = object()
+
+
+class Pipeline:
+    """
+    Pipeline par étapes reliées par des queues bornées (backpressure : feed() bloque si l'étape est pleine).
+
+    - feed(item, stage=...) : injecte un élément à n'importe quelle étape (ex: offres déjà détaillées
+      envoyées directement au scoring)
+    - close() : plus d'entrées ; attend que chaque étape se vide, dans l'ordre
+    - cancel() (avant close, sur erreur) : les étapes amont abandonnent leurs éléments en attente,
+      la dernière étape traite encore tout ce qu'elle a reçu (rien de déjà produit n'est perdu)
+    - on_progress(name, snapshot) : appelé après chaque élément traité (UI / logs)
+    """
+
+    def __init__(self, stages: list, on_progress=None):
+        self.stages = list(stages)
+        self.on_progress = on_progress
+        self._by_name = {s.name: s for s in self.stages}
+        self._started = False
+        self._cancelled = threading.Event()
+
+    def start(self) -> "Pipeline":
+        for idx, stage in enumerate(self.stages):
+            nxt = self.stages[idx + 1] if idx + 1 < len(self.stages) else None
+            alive = [stage.workers]
+            alive_lock = threading.Lock()
+            for w in range(stage.workers):
+                t = threading.Thread(
+                    target=self._work,
+                    args=(stage, nxt, alive, alive_lock),
+                    name=f"pipeline-{stage.name}-{w}",
+                    daemon=True,
+                )
+                t.start()
+                stage._threads.append(t)
+        self._started = True
+        return self
+
+    def _emit(self, stage: Stage, nxt: Stage | None, out) -> None:
+        if out is None:
+            return
+        items = out if isinstance(out, list) else [out]
+        for item in items:
+            if nxt is not None:
+                nxt.queue.put(item)
+                nxt.metrics.add(received=1)
+            stage.metrics.add(emitted=1)
+
+    def _work(self, stage: Stage, nxt: Stage | None, alive: list, alive_lock: threading.Lock) -> None:
+        while True:
+            item = stage.queue.get()
+            if item is _END:
+                break
+            if nxt is not None and self._cancelled.is_set():
+                continue
+            t0 = time.monotonic()
+            try:
+                self._emit(stage, nxt, stage.func(item))
+            except Exception:
+                stage.metrics.add(errors=1)
+                traceback.print_exc()
+            stage.metrics.add(done=1, busy_seconds=time.monotonic() - t0)
+            if self.on_progress:
+                try:
+                    self.on_progress(stage.name, stage.metrics.snapshot())
+                except Exception:
+                    pass
+
+        # dernier worker de l'étape : flush éventuel puis fin de l'étape suivante
+        with alive_lock:
+            alive[0] -= 1
+            last = alive[0] == 0
+        if last:
+            if stage.on_close:
+                try:
+                    self._emit(stage, nxt, stage.on_close())
+                except Exception:
+                    stage.metrics.add(errors=1)
+                    traceback.print_exc()
+            if nxt is not None:
+                for _ in range(nxt.workers):
+                    nxt.queue.put(_END)
+
+    def feed(self, item, stage: str | None = None) -> None:
+        target = self._by_name[stage] if stage else self.stages[0]
+        target.queue.put(item)
+        target.metrics.add(received=1)
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def close(self) -> dict:
+        """Termine l'alimentation et attend la fin de toutes les étapes => métriques par étape."""
+        first = self.stages[0]
+        for _ in range(first.workers):
+            first.queue.put(_END)
+        for stage in self.stages:
+            for t in stage._threads:
+                t.join()
+        return self.metrics()
+
+    def metrics(self) -> dict:
+        return {s.name: s.metrics.snapshot() for s in self.stages}
+
+    def log_metrics(self) -> None:
+        for name, m in self.metrics().items():
+            print(
+                f"[PIPELINE] {name} : {m['done']}/{m['received']} traités, {m['emitted']} transmis, "
+                f"{m['errors']} erreurs, {m['per_second']} /s ({m['busy_seconds']}s de travail)"
+            )
@@ -1,25 +1,65 @@
 import os
 import json
 import math
+import threading
+import urllib.parse
 from datetime import datetime
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
 from scraping.JobFinder import JobFinder, generate_offer_id
-from scraping.utils import measure_time, create_driver, load_id_sets_for_platform
+from scraping.utils import iter_map_offers, load_id_sets_for_platform
+from scraping.driver_pool import get_driver_pool
+from scraping.http_engine import get_http_engine
+from scraping.html_parsing import make_soup
+from scraping.selenium_waits import wait_for_any
+from scraping.incremental import IncrementalGuard, incremental_enabled
 
 
 class Apec(JobFinder):
     """
-    Scraper Apec (Selenium).
+    Scraper Apec : HTTP d'abord (webservices JSON appelés par le site), Selenium en secours.
     Convention:
     - fetch_detail(url) -> {"title":..., "description":...} ou None
+    - les drivers viennent du pool partagé (scraping.driver_pool)
+    - config "apec_mode" : "http" (défaut, fallback Selenium) ou "selenium"
     """
 
+    platform = "apec"
+    SEARCH_API = "https://www.apec.fr/cms/webservices/rechercheOffre"
+    DETAIL_API = "https://www.apec.fr/cms/webservices/offre/public?numeroOffre={numero}"
+    OFFER_URL = "https://www.apec.fr/candidat/recherche-emploi.html/emploi/detail-offre/{numero}"
+    PER_PAGE = 20
+    MAX_PARALLEL_PAGES = 6
+
+    # marqueurs Selenium : contenu utile OU page morte => une seule attente combinée
+    DETAIL_TARGETS = {
+        "description": (By.XPATH, "//div[@class='col-lg-8 border-L']"),
+        "expired": (By.XPATH, '//*[contains(text(), "n\'est plus disponible") or contains(text(), "n\'existe pas")]'),
+    }
+    LISTING_TARGETS = {
+        "offers": (By.CSS_SELECTOR, "a[queryparams]"),
+        "empty": (By.XPATH, '//*[contains(text(), "Aucune offre") or contains(text(), "aucun résultat")]'),
+    }
+
+    # paramètres de l'URL de recherche transmis tels quels (listes) au webservice
+    LIST_PARAMS = (
+        "lieux",
+        "typesConvention",
+        "typesContrat",
+        "fonctions",
+        "niveauxExperience",
+        "secteursActivite",
+        "typesTeletravail",
+        "statutPoste",
+    )
+
     def __init__(self):
         self.keywords = []
         self.base_url = ""
+        self.search_params = {}
+        self.mode = "http"
+        self.sort_by_date = False
+        self.http = get_http_engine()
         self.get_config()
 
     def get_config(self):
@@ -28,11 +68,16 @@ class Apec(JobFinder):
             config = json.load(f)
 
         self.keywords = config.get("keywords", [])
+        self.mode = (config.get("apec_mode", "http") or "http").lower()
+        # mode incrémental : plus récentes d'abord pour s'arrêter dès le connu
+        self.sort_by_date = incremental_enabled()
         raw_url = config.get("url", {}).get("apec", "").strip()
         if not raw_url:
             self.base_url = ""
             return
 
+        self.search_params = urllib.parse.parse_qs(urllib.parse.urlparse(raw_url).query)
+
         # on force placeholders {keywords} et {page} si besoin
         if "{keywords}" not in raw_url:
             raw_url = raw_url.replace("keywords=", "keywords={keywords}")
@@ -40,107 +85,215 @@ class Apec(JobFinder):
             raw_url += "&page={page}"
         self.base_url = raw_url
 
-    def _empty_df(self):
-        return self.formatData("apec", [], [], [], [], [])
-
     # ------------------------------
-    # Convention: fetch_detail(url)
+    # HTTP (webservices JSON)
     # ------------------------------
-    def fetch_detail(self, url: str) -> dict | None:
-        driver = create_driver()
+    @staticmethod
+    def _numero_from_url(url: str) -> str:
+        path = urllib.parse.urlparse(url).path.rstrip("/")
+        return path.rsplit("/", 1)[-1] if "/detail-offre/" in path else ""
+
+    @staticmethod
+    def _format_date(raw: str) -> str:
+        # "2024-05-10T00:00:00.000+0000" -> "10/05/2024" (formatData lit les dates Apec en dayfirst)
         try:
-            driver.get(url)
-
-            # titre
-            try:
-                title_el = WebDriverWait(driver, 6).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "h1"))
+            return datetime.strptime((raw or "")[:10], "%Y-%m-%d").strftime("%d/%m/%Y")
+        except ValueError:
+            return ""
+
+    @staticmethod
+    def _html_to_text(html: str) -> str:
+        return make_soup(html).get_text(" ", strip=True) if html else ""
+
+    def _search_payload(self, keyword: str, start_index: int) -> dict:
+        payload = {
+            "typeClient": "CADRE",
+            "sorts": [{"type": "DATE" if self.sort_by_date else "SCORE", "direction": "DESCENDING"}],
+            "pagination": {"range": self.PER_PAGE, "startIndex": start_index},
+            "activeFiltre": True,
+            "pointGeolocDeReference": {"distance": 0},
+            "motsCles": (self.search_params.get("motsCles") or [keyword])[0],
+        }
+        for key in self.LIST_PARAMS:
+            payload[key] = list(self.search_params.get(key, []))
+        return payload
+
+    def _http_headers(self) -> dict:
+        return {
+            "Accept": "application/json",
+            "Origin": "https://www.apec.fr",
+            "Referer": "https://www.apec.fr/candidat/recherche-emploi.html/emploi",
+        }
+
+    def _parse_search_page(self, res) -> tuple[int, list] | None:
+        """Réponse rechercheOffre => (totalCount, [(title, comp, link, date)]) ou None si inexploitable."""
+        if not res.ok:
+            return None
+        try:
+            data = res.json()
+        except ValueError:
+            return None
+        if not isinstance(data, dict) or "resultats" not in data:
+            return None
+
+        cards = []
+        for r in data.get("resultats") or []:
+            numero = str(r.get("numeroOffre") or "").strip()
+            if not numero:
+                continue
+            cards.append((
+                (r.get("intitule") or "").strip(),
+                (r.get("nomCommercial") or "").strip(),
+                self.OFFER_URL.format(numero=numero),
+                self._format_date(r.get("datePublication") or ""),
+            ))
+        return int(data.get("totalCount") or 0), cards
+
+    def _offer_ids(self, cards: list) -> list[str]:
+        return [generate_offer_id("apec", link) for (_, _, link, _) in cards]
+
+    def _http_listing(
+        self, keyword: str, update_callback=None, guard: IncrementalGuard | None = None
+    ) -> tuple[list, bool] | None:
+        """Listing via le webservice de recherche => (cartes, listing complet ?) ; None => passer en Selenium."""
+        def _fetch(page: int):
+            return self.http.submit(
+                self.http.afetch(
+                    self.SEARCH_API, method="POST", headers=self._http_headers(),
+                    json_body=self._search_payload(keyword, page * self.PER_PAGE),
                 )
-                title = title_el.text.strip()
-            except Exception:
-                title = ""
+            )
 
-            # description
-            try:
-                job_description_element = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, "//div[@class='col-lg-8 border-L']"))
-                )
-                description = job_description_element.text.strip()
-            except Exception:
-                description = ""
+        first = self._parse_search_page(_fetch(0).result())
+        if first is None:
+            print("APEC : recherche HTTP inexploitable, fallback Selenium.")
+            return None
+
+        total_offers, cards = first
+        total_pages = max(1, math.ceil(total_offers / self.PER_PAGE))
+        if update_callback:
+            update_callback(len(cards), max(len(cards), 1), 1, total_pages)
+        if guard is not None and guard.page(self._offer_ids(cards), [c[3] for c in cards]):
+            return cards, True
+
+        # pages suivantes par fenêtres parallèles, traitées dans l'ordre (arrêt incrémental)
+        window = self.MAX_PARALLEL_PAGES if guard is not None and guard.active else total_pages
+        failed = False
+        for first_page in range(1, total_pages, window):
+            pages = range(first_page, min(first_page + window, total_pages))
+            futures = [_fetch(page) for page in pages]
+            for page, fut in zip(pages, futures):
+                parsed = self._parse_search_page(fut.result())
+                if parsed is None:
+                    print(f"APEC : page {page + 1} de la recherche HTTP inexploitable.")
+                    failed = True
+                page_cards = parsed[1] if parsed is not None else []
+                cards.extend(page_cards)
+                if update_callback:
+                    update_callback(len(cards), max(len(cards), 1), page + 1, total_pages)
+                if guard is not None and guard.page(self._offer_ids(page_cards), [c[3] for c in page_cards]):
+                    for f in futures:
+                        f.cancel()
+                    return cards, not failed
 
+        return cards, not failed
+
+    def _parse_detail_json(self, res) -> dict | None:
+        if not res.ok:
+            return None
+        try:
+            data = res.json()
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        parts = [
+            self._html_to_text(data.get("texteHtml") or ""),
+            self._html_to_text(data.get("texteHtmlProfil") or ""),
+            self._html_to_text(data.get("texteHtmlEntreprise") or ""),
+        ]
+        description = "\n".join(p for p in parts if p)
+        if not description:
+            return None
+        return {"title": (data.get("intitule") or "").strip(), "description": description}
+
+    def _detail_api_url(self, url: str) -> str | None:
+        numero = self._numero_from_url(url)
+        return self.DETAIL_API.format(numero=numero) if numero else None
+
+    def _http_detail(self, url: str) -> dict | None:
+        api_url = self._detail_api_url(url)
+        if not api_url:
+            return None
+        res = self.http.fetch(api_url, headers=self._http_headers())
+        return self._parse_detail_json(res)
+
+    # ------------------------------
+    # Selenium (fallback)
+    # ------------------------------
+    def _selenium_detail(self, url: str) -> dict | None:
+        with get_driver_pool().driver(url) as driver:
+            found, element = wait_for_any(driver, "apec_detail", self.DETAIL_TARGETS)
+            if found != "description":
+                return None
+            description = element.text.strip()
             if not description:
                 return None
 
+            # le titre est rendu avec la description : lecture directe, sans attente
+            titles = driver.find_elements(By.TAG_NAME, "h1")
+            title = titles[0].text.strip() if titles else ""
+
             return {"title": title or "", "description": description}
-        finally:
-            try:
-                driver.quit()
-            except Exception:
-                pass
 
     def _close_cookies(self, driver):
+        # bandeau déjà présent ou absent (bloqué en profil lean) : pas d'attente dédiée
         try:
-            btn = WebDriverWait(driver, 2).until(
-                EC.element_to_be_clickable((By.ID, "onetrust-reject-all-handler"))
-            )
-            btn.click()
+            for btn in driver.find_elements(By.ID, "onetrust-reject-all-handler"):
+                if btn.is_displayed():
+                    btn.click()
+                    break
         except Exception:
             pass
 
-    @measure_time
-    def getJob(self, update_callback=None, cache=None, profile_id: str = ""):
-        if not self.base_url or not self.keywords:
-            print("APEC : config incomplète, scraping ignoré.")
-            return self._empty_df()
-
-        # fallback legacy sets si pas de cache
-        blacklist_ids, whitelist_ids, known_offer_ids = set(), set(), set()
-        if cache is None:
-            try:
-                blacklist_ids, whitelist_ids, known_offer_ids = load_id_sets_for_platform("apec")
-            except Exception:
-                pass
-
-        driver = create_driver()
-        all_jobs = []
-
-        try:
-            keyword = self.keywords[0]  # Apec url déjà construite pour le profil
-            # page 0 pour détecter total
-            first_url = self.base_url.format(keywords=keyword, page=0)
-            driver.get(first_url)
+    def _selenium_listing(
+        self, keyword: str, update_callback=None, guard: IncrementalGuard | None = None
+    ) -> tuple[list, bool]:
+        """Listing via Chrome => (cartes, listing complet ?)."""
+        cards = []
+        failed = False
+        # page 0 pour détecter total
+        first_url = self.base_url.format(keywords=keyword, page=0)
+        pool = get_driver_pool()
+        with pool.driver(first_url) as driver:
+            wait_for_any(driver, "apec_listing", self.LISTING_TARGETS)
             self._close_cookies(driver)
 
-            # total offers (best effort)
+            # total offers (best effort, rendu avec la liste)
             total_offers = 0
             try:
-                total_el = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "span[data-cy='count-results']"))
-                )
+                total_el = driver.find_element(By.CSS_SELECTOR, "span[data-cy='count-results']")
                 txt = total_el.text.strip().replace(" ", "")
                 total_offers = int("".join([c for c in txt if c.isdigit()]) or 0)
             except Exception:
                 total_offers = 0
 
             # pages estimées (20/page)
-            per_page = 20
-            total_pages = max(1, math.ceil(total_offers / per_page)) if total_offers else 30
+            total_pages = max(1, math.ceil(total_offers / self.PER_PAGE)) if total_offers else 30
 
-            seen = set()
             for page in range(total_pages):
                 url = self.base_url.format(keywords=keyword, page=page)
-                driver.get(url)
+                pool.get(driver, url)
+                found, _ = wait_for_any(driver, "apec_listing", self.LISTING_TARGETS)
                 self._close_cookies(driver)
+                if found is None:
+                    # ni offres ni "aucun résultat" : page non chargée, le listing est incomplet
+                    failed = True
 
-                try:
-                    offer_elements = WebDriverWait(driver, 5).until(
-                        EC.presence_of_all_elements_located(
-                            (By.CSS_SELECTOR, "a[queryparams]")
-                        )
-                    )
-                except Exception:
-                    offer_elements = []
+                offer_elements = (
+                    driver.find_elements(By.CSS_SELECTOR, "a[queryparams]") if found == "offers" else []
+                )
 
                 if not offer_elements:
                     # stop si pages vides répétées
@@ -148,67 +301,136 @@ class Apec(JobFinder):
                         break
                     continue
 
+                page_cards = []
                 for a in offer_elements:
                     link = a.get_attribute("href") or ""
-                    link = link.split("?")[0]
-                    if not link or link in seen:
-                        continue
-
-                    title = a.text.strip() or ""
-                    comp = ""
-                    datetime_txt = ""
-
-                    offer_id = generate_offer_id("apec", link)
+                    page_cards.append((a.text.strip() or "", "", link.split("?")[0], ""))
+                cards.extend(page_cards)
 
-                    if cache is not None:
-                        if cache.exists(offer_id):
-                            continue
-                        cache.upsert_url(offer_id, "apec", link, "PENDING_URL")
-                    else:
-                        if offer_id in blacklist_ids or offer_id in whitelist_ids or offer_id in known_offer_ids:
-                            continue
+                if update_callback:
+                    update_callback(len(cards), max(len(cards), 1), page + 1, total_pages)
+                if guard is not None and guard.page(self._offer_ids(page_cards)):
+                    break
+        return cards, not failed
 
-                    seen.add(link)
-                    all_jobs.append((title, comp, link, datetime_txt, offer_id))
+    # ------------------------------
+    # Convention: fetch_detail(url)
+    # ------------------------------
+    def fetch_detail(self, url: str) -> dict | None:
+        if self.mode == "http":
+            try:
+                d = self._http_detail(url)
+            except Exception:
+                d = None
+            if d:
+                return d
+        return self._selenium_detail(url)
 
-                if update_callback:
-                    update_callback(len(all_jobs), max(len(all_jobs), 1), page + 1, total_pages)
+    def iter_detailed(self, update_callback=None, cache=None, profile_id: str = ""):
+        if not self.base_url or not self.keywords:
+            print("APEC : config incomplète, scraping ignoré.")
+            return
 
-        finally:
+        # fallback legacy sets si pas de cache
+        blacklist_ids, whitelist_ids, known_offer_ids = set(), set(), set()
+        if cache is None:
             try:
-                driver.quit()
+                blacklist_ids, whitelist_ids, known_offer_ids = load_id_sets_for_platform("apec")
             except Exception:
                 pass
 
+        keyword = self.keywords[0]  # Apec url déjà construite pour le profil
+        listing = None
+        if self.mode == "http":
+            guard = IncrementalGuard(cache, "apec", f"{self.base_url}|{keyword}", sorted_by_date=self.sort_by_date)
+            listing = self._http_listing(keyword, update_callback, guard)
+        if listing is None:
+            guard = IncrementalGuard(cache, "apec", f"{self.base_url}|{keyword}")
+            listing = self._selenium_listing(keyword, update_callback, guard)
+        cards, complete = listing
+        # pages en échec : pas de nouveau watermark, le prochain run ne doit pas s'arrêter avant elles
+        if complete:
+            guard.finish()
+
+        all_jobs = []
+        seen = set()
+        cards = [c for c in cards if c[2]]
+        offer_ids = [generate_offer_id("apec", c[2]) for c in cards]
+        unknown = set(cache.filter_unknown(offer_ids)) if cache is not None else None
+        for (title, comp, link, datetime_txt), offer_id in zip(cards, offer_ids):
+            if link in seen:
+                continue
+
+            if cache is not None:
+                if offer_id not in unknown:
+                    continue
+            else:
+                if offer_id in blacklist_ids or offer_id in whitelist_ids or offer_id in known_offer_ids:
+                    continue
+
+            seen.add(link)
+            all_jobs.append((title, comp, link, datetime_txt, offer_id))
+
+        if cache is not None:
+            cache.upsert_urls_many((offer_id, "apec", link, "PENDING_URL") for (_, _, link, _, offer_id) in all_jobs)
+
         if not all_jobs:
-            return self._empty_df()
+            return
 
-        # détails (séquentiel, selenium)
-        list_title, list_content, list_company, list_link, list_datetime = [], [], [], [], []
         total = len(all_jobs)
+        done = [0]
+        done_lock = threading.Lock()
 
-        for i, (title, comp, link, datetime_txt, offer_id) in enumerate(all_jobs):
-            d = self.fetch_detail(link)
-            if not d:
+        def _tick():
+            with done_lock:
+                done[0] += 1
                 if update_callback:
-                    update_callback(i + 1, total)
-                continue
+                    update_callback(done[0], total)
 
+        def _keep(job, d):
+            title, comp, link, datetime_txt, offer_id = job
             final_title = d.get("title") or title or ""
             desc = d.get("description") or ""
 
             if cache is not None:
                 cache.upsert_detail(offer_id, "apec", link, final_title, desc, status="DETAILED")
 
-            list_title.append(final_title)
-            list_content.append(desc)
-            list_company.append(comp)
-            list_link.append(link)
-            list_datetime.append(datetime_txt)
+            return final_title, comp, link, datetime_txt, desc
+
+        # 1) détails HTTP (async, sans thread par offre)
+        fallback_jobs = all_jobs
+        if self.mode == "http":
+            fallback_jobs = []
+            jobs_by_api = {}
+            for job in all_jobs:
+                api_url = self._detail_api_url(job[2])
+                if api_url:
+                    jobs_by_api[api_url] = job
+                else:
+                    fallback_jobs.append(job)
+
+            for api_url, res in self.http.iter_fetch(list(jobs_by_api), headers=self._http_headers()):
+                job = jobs_by_api[api_url]
+                d = self._parse_detail_json(res)
+                if not d:
+                    fallback_jobs.append(job)
+                    continue
+                yield _keep(job, d)
+                _tick()
 
-            if update_callback:
-                update_callback(i + 1, total)
+            if fallback_jobs:
+                print(f"APEC : {len(fallback_jobs)} détails non récupérés en HTTP, fallback Selenium.")
+
+        # 2) détails Selenium (parallèle, un driver du pool par worker)
+        def _map(job):
+            try:
+                d = self._selenium_detail(job[2])
+            finally:
+                _tick()
+            if not d:
+                return None
+            return _keep(job, d)
 
-        df = self.formatData("apec", list_title, list_content, list_company, list_link, list_datetime)
-        df = df.drop_duplicates(subset="hash", keep="first")
-        return df
+        pool = get_driver_pool() if fallback_jobs else None
+        if fallback_jobs:
+            yield from iter_map_offers(fallback_jobs, _map, io_bound=True, max_workers=pool.size)
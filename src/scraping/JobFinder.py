@@ -3,7 +3,9 @@ import os
 from typing import Optional
 
 import pandas as pd
-import requests
+
+from scraping.http_engine import get_http_engine, FetchResult
+from scraping.utils import measure_time
 
 
 def generate_offer_id(plateforme: str, link: str) -> str:
@@ -13,7 +15,15 @@ def generate_offer_id(plateforme: str, link: str) -> str:
 
 
 class JobFinder:
-    """Base scraper helpers."""
+    """
+    Base scraper helpers.
+
+    Chaque scraper implémente iter_detailed() : générateur de (title, company, link, date, description)
+    au fil des détails récupérés. getJob() (DataFrame complet) et iterJob() (petits DataFrames
+    en flux, pour scorer / écrire le CSV pendant que le scraping continue) en découlent.
+    """
+
+    platform = ""  # clé source : "wttj", "apec", "linkedin", "sp"
 
     def get_offer_cache(self) -> Optional[object]:
         """Retourne le cache SQLite par profil si dispo, sinon None."""
@@ -66,18 +76,51 @@ class JobFinder:
 
         return df
 
-    def getJob(self, update_callback=None):
+    def iter_detailed(self, update_callback=None, cache=None, profile_id: str = ""):
         """Méthode à surcharger dans chaque scraper concret."""
         raise NotImplementedError
 
-    def get_content(self, url: str) -> requests.Response:
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/123.0.0.0 Safari/537.36"
-            ),
-            "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
-        }
-        response = requests.get(url, headers=headers, timeout=20)
-        return response
+    def _jobs_to_df(self, jobs) -> pd.DataFrame:
+        df = self.formatData(
+            self.platform,
+            [t for (t, c, l, d, desc) in jobs],
+            [desc for (t, c, l, d, desc) in jobs],
+            [c for (t, c, l, d, desc) in jobs],
+            [l for (t, c, l, d, desc) in jobs],
+            [d for (t, c, l, d, desc) in jobs],
+        )
+        return df.drop_duplicates(subset="hash", keep="first")
+
+    def iterJob(self, update_callback=None, cache=None, profile_id: str = "", batch_size: int = 5):
+        """Génère des DataFrames de `batch_size` offres détaillées, dès qu'elles sont prêtes."""
+        batch = []
+        seen_hashes = set()
+
+        def _flush():
+            df = self._jobs_to_df(batch)
+            df = df[~df["hash"].isin(seen_hashes)]
+            seen_hashes.update(df["hash"])
+            return df
+
+        for job in self.iter_detailed(update_callback=update_callback, cache=cache, profile_id=profile_id):
+            batch.append(job)
+            if len(batch) >= batch_size:
+                df = _flush()
+                batch = []
+                if not df.empty:
+                    yield df
+        if batch:
+            df = _flush()
+            if not df.empty:
+                yield df
+
+    @measure_time
+    def getJob(self, update_callback=None, cache=None, profile_id: str = ""):
+        """DataFrame complet des offres détaillées (API historique, bloquante)."""
+        return self._jobs_to_df(
+            list(self.iter_detailed(update_callback=update_callback, cache=cache, profile_id=profile_id))
+        )
+
+    def get_content(self, url: str) -> FetchResult:
+        """GET via le moteur HTTP partagé (pool de connexions, timeouts, retries)."""
+        return get_http_engine().fetch(url)
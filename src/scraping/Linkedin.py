@@ -1,33 +1,33 @@
 from tqdm import tqdm
 import pandas as pd
 import json
-import time
-import random
-from bs4 import BeautifulSoup
-import backoff
-from requests.exceptions import RequestException, HTTPError
+import queue
+import threading
 import urllib.parse
-import requests
 import os
 
 from scraping.JobFinder import JobFinder, generate_offer_id
-from scraping.utils import measure_time, parallel_map_offers, load_id_sets_for_platform
+from scraping.utils import load_id_sets_for_platform
+from scraping.http_engine import get_http_engine, FetchResult, DEFAULT_HEADERS
+from scraping.html_parsing import make_soup, class_strainer
+from scraping.incremental import IncrementalGuard, incremental_enabled
+
+# parsing partiel des pages jobs-guest : seules les cartes d'offres sont construites
+CARDS_STRAINER = class_strainer("div", "base-card", "job-search-card")
 
 
 class Linkedin(JobFinder):
+    platform = "linkedin"
     BASE_API = "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search"
 
     def __init__(self):
-        self.headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/123.0.0.0 Safari/537.36"
-            ),
-            "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
-        }
+        self.headers = dict(DEFAULT_HEADERS)
+        self.http = get_http_engine()
         self.search_query = ""
         self.job_id_api = ""
+        # pipeline listing -> détails
+        self.queue_size = 100
+        self.detail_in_flight = 16
         self.get_config()
 
     def get_config(self):
@@ -39,6 +39,9 @@ class Linkedin(JobFinder):
         with open(config_file, "r", encoding="utf-8") as f:
             config = json.load(f)
 
+        self.queue_size = max(1, int(config.get("linkedin_queue_size", 100) or 100))
+        self.detail_in_flight = max(1, int(config.get("linkedin_detail_in_flight", 16) or 16))
+
         raw_url = config.get("url", {}).get("linkedin", "").strip()
         if not raw_url:
             print(f"LinkedIn : aucune URL définie dans {config_file}, scraping ignoré.")
@@ -50,51 +53,79 @@ class Linkedin(JobFinder):
             return
 
         self.search_query = parsed.query
+        # mode incrémental : plus récentes d'abord (sortBy=DD) pour s'arrêter dès le connu
+        if incremental_enabled() and "sortBy=" not in self.search_query:
+            self.search_query += "&sortBy=DD"
         self.job_id_api = f"{self.BASE_API}?{self.search_query}&start={{start}}"
 
-    def _empty_df(self):
-        return self.formatData("linkedin", [], [], [], [], [])
-
-    @backoff.on_exception(backoff.expo, (HTTPError, RequestException), max_tries=3)
-    def _get_page(self, url: str) -> requests.Response:
-        time.sleep(random.uniform(0.2, 0.6))
-        resp = requests.get(url, headers=self.headers, timeout=15)
-        if resp.status_code >= 400:
-            resp.raise_for_status()
+    def _get_page(self, url: str) -> FetchResult:
+        # débit par host (token bucket + Retry-After) et retries gérés par le moteur HTTP
+        resp = self.http.fetch(url, headers=self.headers)
+        if not resp.ok:
+            raise RuntimeError(resp.error or f"HTTP {resp.status_code}")
         return resp
 
-    def fetch_detail(self, url: str) -> dict | None:
-        try:
-            resp = requests.get(url, headers=self.headers, timeout=15)
-            if not resp.ok:
-                return None
-            soup = BeautifulSoup(resp.text, "html.parser")
+    def _parse_cards(self, html: str) -> list:
+        """Cartes d'une page jobs-guest => [(title, company, link, date_str)]."""
+        soup = make_soup(html, only=CARDS_STRAINER)
+        cards = soup.select("div.base-card") or soup.select("div.job-search-card")
 
-            desc_el = (
-                soup.select_one("div.show-more-less-html__markup")
-                or soup.select_one("div.description__text")
-                or soup.select_one("section.description")
+        out = []
+        for card in cards:
+            link_el = (
+                card.select_one("a.base-card__full-link")
+                or card.select_one("a.job-card-container__link")
             )
-            description = desc_el.get_text(" ", strip=True) if desc_el else ""
-            if not description.strip():
-                return None
+            company_el = (
+                card.select_one("h4.base-search-card__subtitle")
+                or card.select_one("div.artdeco-entity-lockup__subtitle span")
+            )
+            date_el = card.select_one("time")
+
+            link = link_el["href"].split("?")[0] if link_el and link_el.get("href") else ""
+            if not link:
+                continue
+
+            title = link_el.get_text(" ", strip=True) if link_el else ""
+            company = company_el.get_text(" ", strip=True) if company_el else ""
+            date_str = date_el.get("datetime") if date_el else ""
+            out.append((title, company, link, date_str))
+        return out
+
+    def _parse_detail(self, html: str) -> dict | None:
+        soup = make_soup(html)
+
+        desc_el = (
+            soup.select_one("div.show-more-less-html__markup")
+            or soup.select_one("div.description__text")
+            or soup.select_one("section.description")
+        )
+        description = desc_el.get_text(" ", strip=True) if desc_el else ""
+        if not description.strip():
+            return None
+
+        title_el = soup.select_one("h1")
+        title = title_el.get_text(" ", strip=True) if title_el else ""
+        if not title:
+            og = soup.find("meta", property="og:title")
+            if og and og.get("content"):
+                title = og["content"].strip()
 
-            title_el = soup.select_one("h1")
-            title = title_el.get_text(" ", strip=True) if title_el else ""
-            if not title:
-                og = soup.find("meta", property="og:title")
-                if og and og.get("content"):
-                    title = og["content"].strip()
+        return {"title": title or "", "description": description}
 
-            return {"title": title or "", "description": description}
+    def fetch_detail(self, url: str) -> dict | None:
+        try:
+            resp = self.http.fetch(url, headers=self.headers)
+            if not resp.ok:
+                return None
+            return self._parse_detail(resp.text)
         except Exception:
             return None
 
-    @measure_time
-    def getJob(self, update_callback=None, cache=None, profile_id: str = ""):
+    def iter_detailed(self, update_callback=None, cache=None, profile_id: str = ""):
         if not self.job_id_api:
             print("LinkedIn : configuration invalide ou incomplète, aucun scraping effectué.")
-            return self._empty_df()
+            return
 
         blacklist_ids, whitelist_ids, known_offer_ids = set(), set(), set()
         if cache is None:
@@ -103,97 +134,173 @@ class Linkedin(JobFinder):
             except Exception:
                 pass
 
-        all_jobs = []
-        seen_links = set()
-        start = 0
-        page = 1
+        # Pipeline producteur / consommateur :
+        # - producteur (thread) : pagination jobs-guest -> cartes nouvelles dans une queue bornée
+        # - consommateur (ce thread) : lance le détail de chaque carte dès qu'elle arrive
+        # => pagination et récupération des détails se recouvrent
+        card_q = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        end_of_listing = object()
 
         # On ne connait pas le total exact => cap logique
         total_pages = 200
-
-        while True:
-            url = self.job_id_api.format(start=start)
-            try:
-                resp = self._get_page(url)
-            except Exception as e:
-                print(f"LinkedIn : erreur API jobs-guest : {e}")
-                break
-
-            html = resp.text.strip()
-            if not html:
-                break
-
-            soup = BeautifulSoup(html, "html.parser")
-            cards = soup.select("div.base-card") or soup.select("div.job-search-card")
-            if not cards:
-                break
-
-            for card in cards:
-                link_el = (
-                    card.select_one("a.base-card__full-link")
-                    or card.select_one("a.job-card-container__link")
-                )
-                company_el = (
-                    card.select_one("h4.base-search-card__subtitle")
-                    or card.select_one("div.artdeco-entity-lockup__subtitle span")
-                )
-                date_el = card.select_one("time")
-
-                link = link_el["href"].split("?")[0] if link_el and link_el.get("href") else ""
-                if not link or link in seen_links:
+        progress = {"cards": 0, "detailed": 0, "page": 0}
+        progress_lock = threading.Lock()
+
+        def _report():
+            if not update_callback:
+                return
+            with progress_lock:
+                cards, detailed, page = progress["cards"], progress["detailed"], progress["page"]
+            update_callback(detailed, max(cards, 1), min(page, total_pages), total_pages)
+
+        def _put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    card_q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
                     continue
+            return False
 
-                title = link_el.get_text(" ", strip=True) if link_el else ""
-                company = company_el.get_text(" ", strip=True) if company_el else ""
-                date_str = date_el.get("datetime") if date_el else ""
-
-                offer_id = generate_offer_id("linkedin", link)
-
-                if cache is not None:
-                    if cache.exists(offer_id):
-                        continue
-                    cache.upsert_url(offer_id, "linkedin", link, "PENDING_URL")
-                else:
-                    if offer_id in blacklist_ids or offer_id in whitelist_ids or offer_id in known_offer_ids:
-                        continue
-
-                seen_links.add(link)
-                all_jobs.append((title, company, link, date_str))
-
-            start += 25
-            page += 1
-
-            if update_callback:
-                update_callback(len(all_jobs), max(len(all_jobs), 1), min(page, total_pages), total_pages)
-
-            if page > total_pages:
-                break
-
-        if not all_jobs:
-            return self._empty_df()
+        guard = IncrementalGuard(
+            cache, "linkedin", self.search_query, sorted_by_date="sortBy=DD" in self.search_query
+        )
 
-        def _map(job):
-            title, company, link, date_str = job
-            d = self.fetch_detail(link)
+        def _produce():
+            seen_links = set()
+            start = 0
+            page = 1
+            failed = False
+            try:
+                while not stop.is_set():
+                    url = self.job_id_api.format(start=start)
+                    try:
+                        resp = self._get_page(url)
+                    except Exception as e:
+                        print(f"LinkedIn : erreur API jobs-guest : {e}")
+                        failed = True
+                        break
+
+                    html = resp.text.strip()
+                    if not html:
+                        break
+
+                    cards = self._parse_cards(html)
+                    if not cards:
+                        break
+
+                    # une requête de lecture + une écriture par page (et non 2 par carte)
+                    offer_ids = [generate_offer_id("linkedin", c[2]) for c in cards]
+                    unknown = set(cache.filter_unknown(offer_ids)) if cache is not None else None
+
+                    # décision d'arrêt prise avant l'insertion des cartes de la page dans le cache
+                    last_page = guard.page(offer_ids, [c[3] for c in cards], unknown=unknown)
+
+                    fresh = []
+                    for (title, company, link, date_str), offer_id in zip(cards, offer_ids):
+                        if link in seen_links:
+                            continue
+
+                        if cache is not None:
+                            if offer_id not in unknown:
+                                continue
+                        else:
+                            if offer_id in blacklist_ids or offer_id in whitelist_ids or offer_id in known_offer_ids:
+                                continue
+
+                        seen_links.add(link)
+                        fresh.append((offer_id, (title, company, link, date_str)))
+
+                    if cache is not None:
+                        cache.upsert_urls_many(
+                            (offer_id, "linkedin", card[2], "PENDING_URL") for offer_id, card in fresh
+                        )
+
+                    for _, card in fresh:
+                        with progress_lock:
+                            progress["cards"] += 1
+                        if not _put(card):
+                            return
+
+                    start += 25
+                    page += 1
+                    with progress_lock:
+                        progress["page"] = page
+                    _report()
+
+                    if page > total_pages or last_page:
+                        break
+
+                if not failed and not stop.is_set():
+                    guard.finish()
+            finally:
+                _put(end_of_listing)
+
+        producer = threading.Thread(target=_produce, name="linkedin-listing", daemon=True)
+        producer.start()
+
+        in_flight = {}
+        done_q = queue.Queue()
+        listing_done = False
+
+        def _handle(fut):
+            title, company, link, date_str = in_flight.pop(fut)
+            try:
+                resp = fut.result()
+                d = self._parse_detail(resp.text) if resp.ok else None
+            except Exception as e:
+                print(f"[SCRAP] Erreur sur job {link}: {e}")
+                d = None
             if not d:
                 return None
+
             final_title = d.get("title") or title or ""
             desc = d.get("description") or ""
             if cache is not None:
                 oid = generate_offer_id("linkedin", link)
                 cache.upsert_detail(oid, "linkedin", link, final_title, desc, status="DETAILED")
+            with progress_lock:
+                progress["detailed"] += 1
             return final_title, company, link, date_str, desc
 
-        detailed_jobs = parallel_map_offers(all_jobs, _map, io_bound=True)
-        if not detailed_jobs:
-            return self._empty_df()
-
-        list_title = [t for (t, c, l, d, desc) in detailed_jobs]
-        list_company = [c for (t, c, l, d, desc) in detailed_jobs]
-        list_link = [l for (t, c, l, d, desc) in detailed_jobs]
-        list_datetime = [d for (t, c, l, d, desc) in detailed_jobs]
-        list_content = [desc for (t, c, l, d, desc) in detailed_jobs]
+        try:
+            while True:
+                # 1) détails terminés
+                while True:
+                    try:
+                        fut = done_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    job = _handle(fut)
+                    _report()
+                    if job:
+                        yield job
+
+                # 2) nouvelles cartes tant que la fenêtre de détails n'est pas pleine
+                if not listing_done and len(in_flight) < self.detail_in_flight:
+                    try:
+                        item = card_q.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                    if item is end_of_listing:
+                        listing_done = True
+                        continue
+                    fut = self.http.submit(self.http.afetch(item[2], headers=self.headers))
+                    in_flight[fut] = item
+                    fut.add_done_callback(done_q.put)
+                    continue
 
-        df = self.formatData("linkedin", list_title, list_content, list_company, list_link, list_datetime)
-        df = df.drop_duplicates(subset="hash", keep="first")
-        return df
+                # 3) fenêtre pleine ou listing fini : on attend un détail
+                if in_flight:
+                    job = _handle(done_q.get())
+                    _report()
+                    if job:
+                        yield job
+                    continue
+                break
+        finally:
+            stop.set()
+            for fut in list(in_flight):
+                fut.cancel()
+            producer.join(timeout=5)
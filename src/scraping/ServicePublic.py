@@ -5,10 +5,16 @@ import re
 import urllib.parse
 
 import dateparser
-from bs4 import BeautifulSoup
 
 from scraping.JobFinder import JobFinder, generate_offer_id
-from scraping.utils import measure_time, parallel_map_offers, load_id_sets_for_platform
+from scraping.utils import load_id_sets_for_platform
+from scraping.http_engine import get_http_engine
+from scraping.html_parsing import make_soup, class_strainer
+from scraping.incremental import IncrementalGuard
+
+# parsing partiel : cartes d'offres / widget de pagination
+OFFERS_STRAINER = class_strainer("li", "item")
+PAGINATION_STRAINER = class_strainer("ul", "fr-pagination__list")
 
 
 class ServicePublic(JobFinder):
@@ -18,11 +24,17 @@ class ServicePublic(JobFinder):
     Supporte maintenant:
     - cache (OfferCache) pour alimenter les compteurs UI (PENDING_URL / DETAILED / SCORED_*)
     - update_callback(offres_cur, offres_total, pages_cur, pages_total) pour afficher les pages
+    - listing + détails via le moteur HTTP async partagé (scraping.http_engine)
+    - iter_detailed() : offres générées au fil des détails (getJob / iterJob dans JobFinder)
     """
 
+    platform = "sp"
+
     def __init__(self):
         self.keywords = []
         self.url_template = None  # URL avec mot-cles/{}
+        self.max_parallel_pages = 6
+        self.http = get_http_engine()
         self.get_config()
 
     def get_config(self):
@@ -36,6 +48,7 @@ class ServicePublic(JobFinder):
             return
 
         self.keywords = config.get("keywords", [])
+        self.max_parallel_pages = max(1, int(config.get("sp_max_parallel_pages", 6) or 6))
         raw_url = config.get("url", {}).get("sp", "").strip()
 
         if not raw_url:
@@ -46,9 +59,6 @@ class ServicePublic(JobFinder):
         # Remplace mot-cles/<quelque-chose> par mot-cles/{}
         self.url_template = re.sub(r"mot-cles/[^/]*", "mot-cles/{}", raw_url)
 
-    def _empty_df(self):
-        return self.formatData("sp", [], [], [], [], [])
-
     def build_keywords(self):
         joined_keywords = " ".join(self.keywords)
         return urllib.parse.quote(joined_keywords)
@@ -59,15 +69,73 @@ class ServicePublic(JobFinder):
         date_obj = dateparser.parse(date_str, languages=["fr"])
         return date_obj.strftime("%Y-%m-%d") if date_obj else ""
 
-    @measure_time
-    def getJob(self, update_callback=None, cache=None, profile_id: str = ""):
+    def _parse_listing(self, html: str, base_url: str) -> list:
+        """Cartes d'une page de résultats => [(title, ministere, link, date)]."""
+        soup = make_soup(html, only=OFFERS_STRAINER)
+        cards = []
+        for offer in soup.select("li.fr-col-12.item"):
+            try:
+                link_el = offer.select_one("a.is-same-domain")
+                if not link_el:
+                    continue
+
+                job_link = link_el.get("href", "")
+                if not job_link:
+                    continue
+
+                if not job_link.startswith("http"):
+                    job_link = urllib.parse.urljoin(base_url, job_link)
+
+                job_link = job_link.split("?")[0].strip()
+                if not job_link:
+                    continue
+
+                job_title = link_el.get_text(strip=True) or ""
+
+                ministere_el = offer.select_one("img.fr-responsive-img")
+                job_ministere = ministere_el.get("alt").strip() if ministere_el else ""
+
+                date_el = offer.select_one("li.fr-icon-calendar-line")
+                raw_date = date_el.get_text(strip=True) if date_el else ""
+                job_datetime = self.parse_date(raw_date) if raw_date else ""
+
+                cards.append((job_title, job_ministere, job_link, job_datetime))
+            except Exception as e:
+                print(f"ServicePublic : erreur lecture offre : {e}")
+        return cards
+
+    def _parse_detail(self, html: str) -> dict | None:
+        soup = make_soup(html)
+        target_div = soup.find(
+            "div",
+            class_=lambda x: x is not None and "col-left" in x.split() and "rte" in x.split(),
+        )
+        if not target_div:
+            return None
+        description = target_div.get_text(" ", strip=True)
+        if not description:
+            return None
+        title_el = soup.select_one("h1")
+        title = title_el.get_text(" ", strip=True) if title_el else ""
+        return {"title": title, "description": description}
+
+    def fetch_detail(self, url: str) -> dict | None:
+        try:
+            res = self.http.fetch(url)
+            if not res.ok:
+                return None
+            return self._parse_detail(res.text)
+        except Exception:
+            return None
+
+    def iter_detailed(self, update_callback=None, cache=None, profile_id: str = ""):
         if not self.url_template:
             print("ServicePublic : URL non configurée, retour DataFrame vide.")
-            return self._empty_df()
+            return
 
         if not self.keywords:
             print("ServicePublic : aucun mot-clé, retour DataFrame vide.")
-            return self._empty_df()
+            return
 
         keywords = self.build_keywords()
         base_url = self.url_template.format(keywords)
@@ -88,8 +156,8 @@ class ServicePublic(JobFinder):
 
         # --- 1) Récupérer nb de pages (best effort) ---
         try:
-            res = self.get_content(base_url)
-            soup = BeautifulSoup(res.text, "html.parser")
+            res = self.http.fetch(base_url)
+            soup = make_soup(res.text, only=PAGINATION_STRAINER)
             pages = soup.select("ul.fr-pagination__list a.fr-pagination__link")
             page_numbers = [
                 int(a.get_text(strip=True))
@@ -100,59 +168,49 @@ class ServicePublic(JobFinder):
         except Exception:
             last_page = 1
 
-        # --- 2) Récupérer toutes les offres sur toutes les pages ---
+        # --- 2) Récupérer les offres page par page (fenêtres de pages en parallèle) ---
+        # les pages d'une fenêtre arrivent dans le désordre mais sont traitées dans l'ordre,
+        # pour que l'arrêt incrémental (pages déjà connues / page répétée) reste déterministe
         all_jobs = []  # (title, comp, link, dt, offer_id)
         seen_links = set()
-
-        for i in range(last_page):
-            page_num = i + 1
-            page_url = base_url.rstrip("/") + f"/page/{page_num}"
-
-            try:
-                res = self.get_content(page_url)
-            except Exception as e:
-                print(f"ServicePublic : erreur requête page {page_num} : {e}")
-                # update pages quand même
+        page_urls = [base_url.rstrip("/") + f"/page/{n}" for n in range(1, last_page + 1)]
+        guard = IncrementalGuard(cache, "sp", base_url)
+        window = self.max_parallel_pages if guard.active else last_page
+        pages_done = 0
+        stopped = False
+        failed = False
+
+        for first in range(0, last_page, window):
+            batch = page_urls[first:first + window]
+            results = {}
+            for page_url, res in self.http.iter_fetch(batch, max_in_flight=self.max_parallel_pages):
+                pages_done += 1
+                results[page_url] = res
+                # update pages au fil des réponses (offres comptées au traitement)
                 if update_callback:
-                    update_callback(len(all_jobs), max(len(all_jobs), 1), page_num, last_page)
-                continue
-
-            soup = BeautifulSoup(res.text, "html.parser")
-            offers = soup.select("li.fr-col-12.item")
-
-            for offer in offers:
-                try:
-                    link_el = offer.select_one("a.is-same-domain")
-                    if not link_el:
-                        continue
-
-                    job_link = link_el.get("href", "")
-                    if not job_link:
-                        continue
-
-                    if not job_link.startswith("http"):
-                        job_link = urllib.parse.urljoin(base_url, job_link)
-
-                    job_link = job_link.split("?")[0].strip()
-                    if not job_link or job_link in seen_links:
+                    update_callback(len(all_jobs), max(len(all_jobs), 1), pages_done, last_page)
+
+            for n, page_url in enumerate(batch, start=first + 1):
+                res = results[page_url]
+                if not res.ok:
+                    print(f"ServicePublic : erreur requête page {n} : {res.error or f'HTTP {res.status_code}'}")
+                    failed = True
+                    continue
+
+                cards = self._parse_listing(res.text, base_url)
+                offer_ids = [generate_offer_id("sp", c[2]) for c in cards]
+                unknown = set(cache.filter_unknown(offer_ids)) if cache is not None else None
+                stopped = guard.page(offer_ids, [c[3] for c in cards], unknown=unknown)
+
+                fresh = []
+                for (job_title, job_ministere, job_link, job_datetime), offer_id in zip(cards, offer_ids):
+                    if job_link in seen_links:
                         continue
 
-                    job_title = link_el.get_text(strip=True) or ""
-
-                    ministere_el = offer.select_one("img.fr-responsive-img")
-                    job_ministere = ministere_el.get("alt").strip() if ministere_el else ""
-
-                    date_el = offer.select_one("li.fr-icon-calendar-line")
-                    raw_date = date_el.get_text(strip=True) if date_el else ""
-                    job_datetime = self.parse_date(raw_date) if raw_date else ""
-
-                    offer_id = generate_offer_id("sp", job_link)
-
                     # Cache mode
                     if cache is not None:
-                        if cache.exists(offer_id):
+                        if offer_id not in unknown:
                             continue
-                        cache.upsert_url(offer_id, "sp", job_link, "PENDING_URL")
                     else:
                         # Legacy filter mode
                         if offer_id in blacklisted_ids:
@@ -161,52 +219,58 @@ class ServicePublic(JobFinder):
                             continue
 
                     seen_links.add(job_link)
-                    all_jobs.append((job_title, job_ministere, job_link, job_datetime, offer_id))
+                    fresh.append((job_title, job_ministere, job_link, job_datetime, offer_id))
 
-                except Exception as e:
-                    print(f"ServicePublic : erreur lecture offre : {e}")
+                # une page de listing = une lecture + une écriture dans le cache
+                if cache is not None:
+                    cache.upsert_urls_many((offer_id, "sp", link, "PENDING_URL") for (_, _, link, _, offer_id) in fresh)
+                all_jobs.extend(fresh)
+
+                if stopped:
+                    break
 
             # callback pages + offers (total inconnu à ce stade)
             if update_callback:
-                update_callback(len(all_jobs), max(len(all_jobs), 1), page_num, last_page)
+                update_callback(len(all_jobs), max(len(all_jobs), 1), pages_done, last_page)
+            if stopped:
+                break
+
+        if not failed:
+            guard.finish()
 
         if not all_jobs:
             print("ServicePublic : aucune offre trouvée.")
-            return self._empty_df()
+            return
 
         print(f"ServicePublic : fiches récupérées (après filtres/cache) : {len(all_jobs)}")
 
-        # --- 3) Récupération du détail des offres en parallèle (HTTP) ---
-        def _fetch_detail(job):
-            title, comp, link, dt, offer_id = job
-            description = ""
+        # --- 3) Récupération du détail des offres (HTTP async, parsing au fil de l'eau) ---
+        jobs_by_link = {job[2]: job for job in all_jobs}
+        detailed = 0
+
+        for link, res in self.http.iter_fetch(list(jobs_by_link)):
+            title, comp, _, dt, offer_id = jobs_by_link[link]
+
+            if not res.ok:
+                print(f"ServicePublic : erreur récupération détail pour {link} : {res.error or f'HTTP {res.status_code}'}")
+                if cache is not None:
+                    cache.mark_error(offer_id, status="ERROR_DETAIL")
+                continue
+
             try:
-                res = self.get_content(link)
-                soup = BeautifulSoup(res.text, "html.parser")
-                target_div = soup.find(
-                    "div",
-                    class_=lambda x: x is not None and "col-left" in x.split() and "rte" in x.split(),
-                )
-                if target_div:
-                    description = target_div.get_text(" ", strip=True)
-                else:
-                    print(f"ServicePublic : aucune description pour {title}, skip.")
-                    if cache is not None:
-                        cache.mark_error(offer_id, status="ERROR_DETAIL")
-                    return None
+                d = self._parse_detail(res.text)
             except Exception as e:
                 print(f"ServicePublic : erreur récupération détail pour {link} : {e}")
-                if cache is not None:
-                    cache.mark_error(offer_id, status="ERROR_DETAIL")
-                return None
+                d = None
 
-            if not description.strip():
-                print(f"ServicePublic : description vide pour {title}, offre ignorée.")
+            if not d:
+                print(f"ServicePublic : aucune description pour {title}, skip.")
                 if cache is not None:
                     cache.mark_error(offer_id, status="ERROR_DETAIL")
-                return None
+                continue
 
-            final_title = title or ""
+            description = d["description"]
+            final_title = title or d.get("title") or ""
 
             if cache is not None:
                 cache.upsert_detail(
@@ -218,35 +282,16 @@ class ServicePublic(JobFinder):
                     status="DETAILED",
                 )
 
-            return final_title, comp, link, dt, description, offer_id
-
-        detailed_jobs = parallel_map_offers(all_jobs, _fetch_detail, io_bound=True)
+            detailed += 1
+            yield final_title, comp, link, dt, description
 
-        if not detailed_jobs:
+        if not detailed:
             print("ServicePublic : aucun détail d'offre récupéré.")
-            return self._empty_df()
+            return
 
         # callback final: offres_tot = offres_cur
         if update_callback:
-            update_callback(len(detailed_jobs), len(detailed_jobs), last_page, last_page)
-
-        list_title = [t for (t, c, l, d, desc, oid) in detailed_jobs]
-        list_company = [c for (t, c, l, d, desc, oid) in detailed_jobs]
-        list_link = [l for (t, c, l, d, desc, oid) in detailed_jobs]
-        list_datetime = [d for (t, c, l, d, desc, oid) in detailed_jobs]
-        list_content = [desc for (t, c, l, d, desc, oid) in detailed_jobs]
-
-        df = self.formatData("sp", list_title, list_content, list_company, list_link, list_datetime)
-
-        # on garde les offer_id calculés (formatData regénère, donc on override)
-        try:
-            df["offer_id"] = [oid for (t, c, l, d, desc, oid) in detailed_jobs]
-            df["source"] = "sp"
-        except Exception:
-            pass
-
-        df = df.drop_duplicates(subset="hash", keep="first")
-        return df
+            update_callback(detailed, detailed, last_page, last_page)
 
 
 if __name__ == "__main__":
@@ -1,26 +1,50 @@
 import json
 import os
 import re
+import threading
 from datetime import datetime as dt, timezone
 
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from bs4 import SoupStrainer
 
 from scraping.JobFinder import JobFinder, generate_offer_id
-from scraping.utils import measure_time, create_driver, load_id_sets_for_platform
+from scraping.utils import iter_map_offers, load_id_sets_for_platform
+from scraping.driver_pool import get_driver_pool
+from scraping.http_engine import get_http_engine
+from scraping.html_parsing import make_soup
+from scraping.selenium_waits import wait_for_any
+
+JSON_LD_STRAINER = SoupStrainer("script", type="application/ld+json")
+# liens d'offres : /fr/companies/<org>/jobs/<slug> (relatifs ou absolus)
+JOB_LINK_RE = re.compile(r'href="((?:https://www\.welcometothejungle\.com)?/fr/companies/[^/"?#]+/jobs/[^/"?#]+)')
+# payload d'hydratation : window.__INITIAL_DATA__ = "<json échappé en chaîne JS>"
+INITIAL_DATA_RE = re.compile(r'window\.__INITIAL_DATA__\s*=\s*("(?:[^"\\]|\\.)*")')
 
 
 class WelcomeToTheJungle(JobFinder):
     """
-    WTTJ via Selenium.
+    WTTJ : HTTP d'abord (données structurées embarquées dans le HTML), Selenium en secours.
     Convention:
     - fetch_detail(url) -> {"title":..., "description":...} ou None
+    - _parse_detail(html) : JSON-LD JobPosting, sinon payload d'hydratation (__INITIAL_DATA__)
+    - les drivers viennent du pool partagé (scraping.driver_pool)
+    - config "wttj_mode" : "http" (défaut, fallback Selenium) ou "selenium"
     """
 
+    platform = "wttj"
+    BASE_URL = "https://www.welcometothejungle.com"
+
+    # marqueurs Selenium : contenu utile OU offre expirée => une seule attente combinée
+    DETAIL_TARGETS = {
+        "description": (By.XPATH, "//div[@id='the-position-section']"),
+        "expired": (By.XPATH, '//*[contains(text(), "n\'est plus disponible") or contains(text(), "plus en ligne")]'),
+    }
+
     def __init__(self):
         self.keywords = []
         self.url = ""
+        self.mode = "http"
+        self.http = get_http_engine()
         self.get_config()
 
     def get_config(self):
@@ -28,54 +52,178 @@ class WelcomeToTheJungle(JobFinder):
         with open(config_file, "r", encoding="utf-8") as f:
             config = json.load(f)
         self.keywords = config.get("keywords", [])
+        self.mode = (config.get("wttj_mode", "http") or "http").lower()
         self.url = re.sub(r"query=[^&]*", "query={}", config.get("url", {}).get("wttj", ""))
 
     def build_urls(self):
         return [self.url.format(kw) for kw in self.keywords if kw]
 
-    def fetch_detail(self, url: str) -> dict | None:
-        driver = create_driver()
-        try:
-            driver.get(url)
+    # ------------------------------
+    # HTTP (données embarquées)
+    # ------------------------------
+    @staticmethod
+    def _html_to_text(html: str) -> str:
+        return make_soup(html).get_text("\n", strip=True) if html else ""
 
+    @staticmethod
+    def _format_date(raw: str) -> str:
+        # "2024-05-10T08:00:00+02:00" -> "2024-05-10T00:00:00Z" (même format que la date du listing)
+        try:
+            return dt.strptime((raw or "")[:10], "%Y-%m-%d").strftime("%Y-%m-%dT%H:%M:%SZ")
+        except ValueError:
+            return ""
+
+    @staticmethod
+    def _iter_json_ld(html: str):
+        """Objets JSON-LD de la page (dict, listes et @graph aplatis)."""
+        for script in make_soup(html, only=JSON_LD_STRAINER).find_all("script"):
             try:
-                voir_plus = WebDriverWait(driver, 3).until(
-                    EC.element_to_be_clickable((By.XPATH, "//span[contains(text(), 'Voir plus')]"))
-                )
-                voir_plus.click()
-            except Exception:
-                pass
+                data = json.loads(script.string or "")
+            except ValueError:
+                continue
+            stack = [data]
+            while stack:
+                obj = stack.pop()
+                if isinstance(obj, list):
+                    stack.extend(obj)
+                elif isinstance(obj, dict):
+                    stack.extend(obj.get("@graph") or [])
+                    yield obj
+
+    @staticmethod
+    def _find_job_in_payload(data):
+        """Premier dict d'offre (name + description + profile) dans le payload d'hydratation."""
+        stack = [data]
+        while stack:
+            obj = stack.pop()
+            if isinstance(obj, dict):
+                if isinstance(obj.get("description"), str) and "profile" in obj and obj.get("name"):
+                    return obj
+                stack.extend(obj.values())
+            elif isinstance(obj, list):
+                stack.extend(obj)
+        return None
+
+    def _parse_detail(self, html: str) -> dict | None:
+        """HTML d'une offre => {"title", "description", "company", "date"} ou None."""
+        if not html:
+            return None
+
+        # 1) JSON-LD JobPosting (SEO, présent dans le HTML rendu serveur)
+        for obj in self._iter_json_ld(html):
+            if obj.get("@type") != "JobPosting":
+                continue
+            description = self._html_to_text(obj.get("description") or "")
+            if not description:
+                continue
+            org = obj.get("hiringOrganization") or {}
+            return {
+                "title": (obj.get("title") or "").strip(),
+                "description": description,
+                "company": (org.get("name") or "").strip() if isinstance(org, dict) else "",
+                "date": self._format_date(obj.get("datePosted") or ""),
+            }
+
+        # 2) payload d'hydratation du front
+        m = INITIAL_DATA_RE.search(html)
+        if m:
+            try:
+                job = self._find_job_in_payload(json.loads(json.loads(m.group(1))))
+            except ValueError:
+                job = None
+            if job:
+                parts = [self._html_to_text(job.get("description") or ""), self._html_to_text(job.get("profile") or "")]
+                description = "\n".join(p for p in parts if p)
+                if description:
+                    org = job.get("organization") or {}
+                    return {
+                        "title": (job.get("name") or "").strip(),
+                        "description": description,
+                        "company": (org.get("name") or "").strip() if isinstance(org, dict) else "",
+                        "date": self._format_date(job.get("published_at") or ""),
+                    }
+        return None
+
+    def _parse_listing(self, html: str) -> list[str]:
+        """Liens d'offres présents dans le HTML d'une page de recherche (ordre conservé)."""
+        links = []
+        for href in JOB_LINK_RE.findall(html or ""):
+            link = href if href.startswith("http") else self.BASE_URL + href
+            if link not in links:
+                links.append(link)
+        return links
+
+    # ------------------------------
+    # Selenium (fallback)
+    # ------------------------------
+    def _selenium_detail(self, url: str) -> dict | None:
+        with get_driver_pool().driver(url) as driver:
+            found, description_div = wait_for_any(driver, "wttj_detail", self.DETAIL_TARGETS)
+            if found != "description":
+                return None
 
+            # "Voir plus" déjà rendu avec la section : clic direct, sans attente dédiée
             try:
-                title = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "h1"))
-                ).text.strip()
+                for voir_plus in driver.find_elements(By.XPATH, "//span[contains(text(), 'Voir plus')]"):
+                    if voir_plus.is_displayed():
+                        voir_plus.click()
+                        break
             except Exception:
-                title = ""
+                pass
 
             try:
-                description_div = WebDriverWait(driver, 10).until(
-                    EC.presence_of_element_located((By.XPATH, "//div[@id='the-position-section']"))
-                )
                 description = description_div.text.strip()
             except Exception:
-                description = ""
-
+                # section re-rendue après le clic
+                sections = driver.find_elements(By.XPATH, "//div[@id='the-position-section']")
+                description = sections[0].text.strip() if sections else ""
             if not description:
                 return None
 
+            titles = driver.find_elements(By.TAG_NAME, "h1")
+            title = titles[0].text.strip() if titles else ""
+
             return {"title": title or "", "description": description}
-        finally:
-            try:
-                driver.quit()
-            except Exception:
-                pass
 
-    @measure_time
-    def getJob(self, update_callback=None, cache=None, profile_id: str = ""):
+    def _selenium_listing(self, urls: list[str]) -> dict:
+        """{url de recherche: [(titre, lien)]} rendu via Chrome."""
+        links_by_url = {}
+        pool = get_driver_pool()
+        with pool.driver(urls[0] if urls else None) as driver:
+            for i, url in enumerate(urls):
+                if i:
+                    pool.get(driver, url)
+                # Les liens d'offres sont généralement sous la forme /fr/companies/<org>/jobs/<slug>
+                cards = driver.find_elements(
+                    By.XPATH,
+                    "//a[contains(@href, '/fr/companies/') and contains(@href, '/jobs/')]"
+                )
+                found = []
+                for card in cards:
+                    try:
+                        link = card.get_attribute("href")
+                        if link:
+                            found.append((card.text.strip() or "", link.split("?")[0]))
+                    except Exception:
+                        continue
+                links_by_url[url] = found
+        return links_by_url
+
+    # ------------------------------
+    # Convention: fetch_detail(url)
+    # ------------------------------
+    def fetch_detail(self, url: str) -> dict | None:
+        if self.mode == "http":
+            res = self.http.fetch(url)
+            d = self._parse_detail(res.text) if res.ok else None
+            if d:
+                return d
+        return self._selenium_detail(url)
+
+    def iter_detailed(self, update_callback=None, cache=None, profile_id: str = ""):
         urls = self.build_urls()
         if not urls:
-            return self.formatData("wttj", [], [], [], [], [])
+            return
 
         # fallback legacy sets si pas de cache
         blacklist_ids, whitelist_ids, known_offer_ids = set(), set(), set()
@@ -85,97 +233,110 @@ class WelcomeToTheJungle(JobFinder):
             except Exception:
                 pass
 
-        driver = create_driver()
         all_jobs = []
         seen_links = set()
-
         total_pages = len(urls)
-        pages_current = 0
-
-        try:
-            # 1) URLs (par keyword = 1 "page" logique)
-            for idx, url in enumerate(urls, start=1):
-                pages_current = idx
-                driver.get(url)
-
-                # Les liens d'offres sont généralement sous la forme /fr/companies/<org>/jobs/<slug>
-                cards = driver.find_elements(
-                    By.XPATH,
-                    "//a[contains(@href, '/fr/companies/') and contains(@href, '/jobs/')]"
-                )
-
-                for card in cards:
-                    try:
-                        link = card.get_attribute("href")
-                        if not link:
-                            continue
-                        link = link.split("?")[0]
-                        if link in seen_links:
-                            continue
-
-                        title = card.text.strip() or ""
-                        company = ""
-
-                        try:
-                            datetime = dt.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-                        except Exception:
-                            datetime = ""
-
-                        offer_id = generate_offer_id("wttj", link)
+        pages_done = [0]
 
-                        if cache is not None:
-                            if cache.exists(offer_id):
-                                continue
-                            cache.upsert_url(offer_id, "wttj", link, "PENDING_URL")
-                        else:
-                            if offer_id in blacklist_ids or offer_id in whitelist_ids or offer_id in known_offer_ids:
-                                continue
+        def _collect(found):
+            # une page de résultats = une lecture + une écriture dans le cache
+            found = [(title, link) for title, link in found if link]
+            offer_ids = [generate_offer_id("wttj", link) for _, link in found]
+            unknown = set(cache.filter_unknown(offer_ids)) if cache is not None else None
 
-                        seen_links.add(link)
-                        all_jobs.append((title, company, link, datetime, offer_id))
+            fresh = []
+            for (title, link), offer_id in zip(found, offer_ids):
+                if link in seen_links:
+                    continue
 
-                    except Exception:
+                if cache is not None:
+                    if offer_id not in unknown:
+                        continue
+                else:
+                    if offer_id in blacklist_ids or offer_id in whitelist_ids or offer_id in known_offer_ids:
                         continue
 
-                if update_callback:
-                    # offers_total inconnu => on met au moins current (pour éviter 0)
-                    update_callback(len(all_jobs), max(len(all_jobs), 1), pages_current, total_pages)
+                seen_links.add(link)
+                datetime = dt.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+                fresh.append((title, "", link, datetime, offer_id))
 
-        finally:
-            try:
-                driver.quit()
-            except Exception:
-                pass
+            if cache is not None:
+                cache.upsert_urls_many((offer_id, "wttj", link, "PENDING_URL") for (_, _, link, _, offer_id) in fresh)
+            all_jobs.extend(fresh)
+
+            pages_done[0] += 1
+            if update_callback:
+                # offers_total inconnu => on met au moins current (pour éviter 0)
+                update_callback(len(all_jobs), max(len(all_jobs), 1), pages_done[0], total_pages)
+
+        # 1) URLs (par keyword = 1 "page" logique) : HTML brut, puis Chrome si aucun lien
+        selenium_urls = list(urls)
+        if self.mode == "http":
+            selenium_urls = []
+            for url, res in self.http.iter_fetch(urls):
+                links = self._parse_listing(res.text) if res.ok else []
+                if links:
+                    _collect([("", link) for link in links])
+                else:
+                    selenium_urls.append(url)
+
+        if selenium_urls:
+            if self.mode == "http":
+                print(f"WTTJ : {len(selenium_urls)} recherches sans liens en HTTP, fallback Selenium.")
+            for url, found in self._selenium_listing(selenium_urls).items():
+                _collect(found)
 
         if not all_jobs:
-            return self.formatData("wttj", [], [], [], [], [])
+            return
 
-        # 2) détails (séquentiel, selenium)
-        list_title, list_content, list_company, list_link, list_datetime = [], [], [], [], []
+        # 2) détails
         total = len(all_jobs)
+        done = [0]
+        done_lock = threading.Lock()
 
-        for i, (title, company, link, datetime, offer_id) in enumerate(all_jobs, start=1):
-            d = self.fetch_detail(link)
-            if not d:
+        def _tick():
+            with done_lock:
+                done[0] += 1
                 if update_callback:
-                    update_callback(i, total, total_pages, total_pages)
-                continue
+                    update_callback(done[0], total, total_pages, total_pages)
 
+        def _keep(job, d):
+            title, company, link, datetime, offer_id = job
             final_title = d.get("title") or title or ""
             desc = d.get("description") or ""
 
             if cache is not None:
                 cache.upsert_detail(offer_id, "wttj", link, final_title, desc, status="DETAILED")
 
-            list_title.append(final_title)
-            list_content.append(desc)
-            list_company.append(company)
-            list_link.append(link)
-            list_datetime.append(datetime)
-
-            if update_callback:
-                update_callback(i, total, total_pages, total_pages)
+            return final_title, d.get("company") or company, link, d.get("date") or datetime, desc
+
+        # 2a) HTTP : données embarquées, concurrence bornée par le moteur
+        fallback_jobs = all_jobs
+        if self.mode == "http":
+            fallback_jobs = []
+            jobs_by_link = {job[2]: job for job in all_jobs}
+            for link, res in self.http.iter_fetch(list(jobs_by_link)):
+                job = jobs_by_link[link]
+                d = self._parse_detail(res.text) if res.ok else None
+                if not d:
+                    fallback_jobs.append(job)
+                    continue
+                yield _keep(job, d)
+                _tick()
+
+            if fallback_jobs:
+                print(f"WTTJ : {len(fallback_jobs)} détails non extraits en HTTP, fallback Selenium.")
+
+        # 2b) Selenium (parallèle, un driver du pool par worker)
+        def _map(job):
+            try:
+                d = self._selenium_detail(job[2])
+            finally:
+                _tick()
+            if not d:
+                return None
+            return _keep(job, d)
 
-        df = self.formatData("wttj", list_title, list_content, list_company, list_link, list_datetime)
-        df = df.drop_duplicates(subset="hash", keep="first")
-        return df
+        if fallback_jobs:
+            pool = get_driver_pool()
+            yield from iter_map_offers(fallback_jobs, _map, io_bound=True, max_workers=pool.size)
@@ -0,0 +1,89 @@
+import queue
+import threading
+import time
+import traceback
+
+
+_STOP = object()
+
+
+class CacheWriter:
+    """
+    Thread unique d'écriture pour OfferCache : les threads scrapers / pipeline déposent leurs écritures
+    dans une queue bornée (dépôt non bloquant tant qu'elle n'est pas pleine) et ne se disputent plus
+    le verrou d'écriture SQLite.
+
+    - op = callable(con) exécuté sur la connexion du thread d'écriture
+    - regroupement : une transaction pour `batch_size` écritures ou toutes les `interval` secondes
+    - flush() : bloque jusqu'à ce que toutes les écritures déjà déposées soient commitées
+    - close() : flush puis arrêt du thread
+    - une transaction en échec est rejouée écriture par écriture (une op fautive ne fait pas perdre le lot)
+    """
+
+    def __init__(self, connect, max_queue: int = 2000, batch_size: int = 200, interval: float = 0.2):
+        self._connect = connect
+        self.batch_size = max(1, int(batch_size))
+        self.interval = max(0.0, float(interval))
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self.committed = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="offer-cache-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op) -> None:
+        self._queue.put(op)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def _next_batch(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.interval
+        # un marqueur (flush / arrêt) termine le lot : tout ce qui le précède est commité avant lui
+        while len(batch) < self.batch_size and callable(batch[-1]):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, ops: list) -> None:
+        if not ops:
+            return
+        try:
+            with self._connect() as con:
+                for op in ops:
+                    op(con)
+            self.committed += len(ops)
+            return
+        except Exception:
+            traceback.print_exc()
+
+        for op in ops:
+            try:
+                with self._connect() as con:
+                    op(con)
+                self.committed += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[CACHE] Écriture abandonnée : {e}")
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            self._commit([op for op in batch if callable(op)])
+            for marker in batch:
+                if isinstance(marker, threading.Event):
+                    marker.set()
+            if batch[-1] is _STOP:
+                return
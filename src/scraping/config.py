@@ -0,0 +1,20 @@
+import json
+import os
+
+
+def config_path() -> str:
+    """Fichier de config du profil courant (posé par app.py dans APP_CONFIG_FILE)."""
+    return os.getenv("APP_CONFIG_FILE", "config.json")
+
+
+def read_config() -> dict:
+    """
+    Config du profil courant, relue à chaque appel (elle peut changer entre deux runs).
+    Fichier absent ou illisible => {} : chaque module applique alors ses valeurs par défaut.
+    """
+    try:
+        with open(config_path(), "r", encoding="utf-8") as f:
+            config = json.load(f)
+    except Exception:
+        return {}
+    return config if isinstance(config, dict) else {}
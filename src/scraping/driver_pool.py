@@ -0,0 +1,172 @@
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+
+from scraping.config import read_config
+from scraping.rate_limiter import get_rate_limiter
+from scraping.utils import create_driver
+
+
+DEFAULT_POOL_SIZE = 3
+DEFAULT_MAX_PAGES = 40
+
+
+class DriverPool:
+    """
+    Pool borné et thread-safe de drivers Selenium réutilisables.
+
+    - checkout()/checkin() : emprunt / restitution d'un driver
+    - au plus `size` navigateurs vivants en même temps (les autres threads attendent)
+    - health check à l'emprunt (driver mort => recréé)
+    - recyclage après `max_pages` pages chargées (get) pour limiter les fuites mémoire de Chrome
+    """
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, max_pages: int = DEFAULT_MAX_PAGES, factory=create_driver):
+        self.size = max(1, int(size))
+        self.max_pages = max(1, int(max_pages))
+        self._factory = factory
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._idle = queue.LifoQueue()
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # ---------- Helpers ----------
+
+    @staticmethod
+    def _is_alive(driver) -> bool:
+        try:
+            _ = driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def _quit(self, driver) -> None:
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _new_driver(self):
+        driver = self._factory()
+        with self._lock:
+            self._pages[id(driver)] = 0
+        return driver
+
+    # ---------- Core API ----------
+
+    def checkout(self, timeout: float | None = None):
+        """Emprunte un driver (bloquant tant que le pool est plein)."""
+        if self._closed:
+            raise RuntimeError("DriverPool fermé.")
+        acquired = self._slots.acquire(timeout=timeout) if timeout is not None else self._slots.acquire()
+        if not acquired:
+            raise TimeoutError("Aucun driver Selenium disponible.")
+
+        try:
+            while True:
+                try:
+                    driver = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._new_driver()
+
+                if self._is_alive(driver):
+                    return driver
+                print("[DRIVERS] Driver mort détecté, recréation.")
+                self._quit(driver)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def checkin(self, driver, broken: bool = False) -> None:
+        """Restitue un driver ; il est recyclé s'il est cassé ou a trop servi."""
+        try:
+            with self._lock:
+                pages = self._pages.get(id(driver), 0)
+
+            if broken or self._closed or pages >= self.max_pages:
+                self._quit(driver)
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    def _load(self, driver, url: str) -> None:
+        with self._lock:
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + 1
+        driver.get(url)
+
+    def get(self, driver, url: str) -> None:
+        """driver.get(url) d'un driver emprunté : jeton de débit du host, puis page comptée pour le recyclage."""
+        get_rate_limiter().wait(url)
+        self._load(driver, url)
+
+    @contextmanager
+    def driver(self, url: str | None = None, timeout: float | None = None):
+        """
+        with pool.driver(url) as driver: ... (checkin garanti) ; url, si fournie, est déjà chargée.
+        Son jeton de débit (limiteur partagé, par host) est pris AVANT l'emprunt, pour qu'un host ralenti
+        n'immobilise pas un navigateur dont les autres hosts ont besoin. Pages suivantes : pool.get(driver, url).
+        """
+        if url:
+            get_rate_limiter().wait(url)
+        drv = self.checkout(timeout=timeout)
+        broken = False
+        try:
+            if url:
+                self._load(drv, url)
+            yield drv
+        except Exception:
+            broken = not self._is_alive(drv)
+            raise
+        finally:
+            self.checkin(drv, broken=broken)
+
+    def close(self) -> None:
+        """Ferme les drivers inactifs ; ceux en cours d'usage seront fermés au checkin."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(driver)
+
+
+# ==========================
+# POOL PARTAGÉ (par process)
+# ==========================
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _read_pool_config() -> tuple[int, int]:
+    config = read_config()
+    size = int(config.get("driver_pool_size", DEFAULT_POOL_SIZE) or DEFAULT_POOL_SIZE)
+    max_pages = int(config.get("driver_max_pages", DEFAULT_MAX_PAGES) or DEFAULT_MAX_PAGES)
+    return size, max_pages
+
+
+def get_driver_pool() -> DriverPool:
+    """Pool partagé par tous les scrapers Selenium (Apec, WTTJ, reprise détail)."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None or _POOL._closed:
+            size, max_pages = _read_pool_config()
+            _POOL = DriverPool(size=size, max_pages=max_pages)
+            print(f"[DRIVERS] Pool Selenium initialisé (size={size}, max_pages={max_pages})")
+        return _POOL
+
+
+def close_driver_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
+
+
+atexit.register(close_driver_pool)
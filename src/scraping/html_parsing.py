@@ -0,0 +1,36 @@
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Backend C (lxml) si installé, sinon parseur pur Python de la stdlib.
+# Le parsing tourne dans nos pools de threads et garde le GIL : lxml le relâche bien plus vite.
+try:
+    import lxml  # noqa: F401
+
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+
+def make_soup(html: str, only: SoupStrainer | None = None) -> BeautifulSoup:
+    """
+    BeautifulSoup avec le meilleur backend dispo.
+    only : SoupStrainer pour ne construire que les noeuds utiles (parsing partiel).
+    """
+    try:
+        return BeautifulSoup(html or "", HTML_PARSER, parse_only=only)
+    except Exception:
+        if HTML_PARSER == "html.parser":
+            raise
+        # HTML que lxml refuse : on retombe sur le parseur stdlib
+        return BeautifulSoup(html or "", "html.parser", parse_only=only)
+
+
+def class_strainer(tag: str, *classes: str) -> SoupStrainer:
+    """
+    SoupStrainer sur <tag> portant au moins une des classes données.
+    Pendant le parsing, l'attribut class n'est pas encore découpé ("fr-col-12 item") :
+    on matche donc les tokens par regex plutôt qu'avec class_="item".
+    """
+    pattern = re.compile(r"(?:^|\s)(?:" + "|".join(re.escape(c) for c in classes) + r")(?:\s|$)")
+    return SoupStrainer(tag, class_=pattern)
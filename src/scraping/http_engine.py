@@ -0,0 +1,442 @@
+import asyncio
+import atexit
+import json
+import os
+import random
+import threading
+import queue
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from scraping.config import config_path, read_config
+from scraping.utils import compute_offer_workers
+from scraping.response_store import ResponseStore
+from scraping.rate_limiter import RateLimiter, get_rate_limiter, parse_retry_after, THROTTLE_STATUSES
+
+
+# ==========================
+# RÉGLAGES HTTP (un seul endroit pour tous les scrapers)
+# ==========================
+def _accept_encoding() -> str:
+    """brotli n'est annoncé que si aiohttp sait le décompresser (paquet brotli installé)."""
+    try:
+        from aiohttp.compression_utils import HAS_BROTLI
+    except Exception:
+        HAS_BROTLI = False
+    return "gzip, deflate, br" if HAS_BROTLI else "gzip, deflate"
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/123.0.0.0 Safari/537.36"
+    ),
+    "Accept-Language": "fr-FR,fr;q=0.9,en;q=0.8",
+    "Accept-Encoding": _accept_encoding(),
+}
+
+# taille max d'une réponse (après décompression) : au-delà on abandonne la page
+MAX_RESPONSE_BYTES = 5 * 1024 * 1024
+# durée de vie d'une connexion keep-alive inactive dans le pool
+KEEPALIVE_TIMEOUT = 30
+
+# statuts pour lesquels on retente (surcharge / indispo temporaire)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class FetchResult:
+    """Réponse HTTP minimale (mêmes attributs que requests.Response pour nos usages)."""
+
+    def __init__(
+        self,
+        url: str,
+        status_code: int = 0,
+        text: str = "",
+        headers: dict | None = None,
+        error: str | None = None,
+        from_cache: bool = False,
+    ):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.error = error
+        self.from_cache = from_cache
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and 200 <= self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def __repr__(self):
+        return f"<FetchResult {self.status_code} {self.url}{' err=' + self.error if self.error else ''}>"
+
+
+class HttpEngine:
+    """
+    Moteur HTTP asynchrone (aiohttp) partagé par les scrapers.
+
+    - une boucle asyncio dédiée tourne dans un thread daemon
+    - une seule ClientSession => pool de connexions keep-alive partagé
+    - concurrence bornée par host (asyncio.Semaphore)
+    - timeout global par requête + retries avec backoff exponentiel
+    - débit par host régulé par un RateLimiter (token bucket AIMD, Retry-After respecté) ;
+      les 429/503 sont retentés jusqu'à throttle_retries fois en plus des retries normaux
+    - réponses plafonnées à max_response_bytes (gzip/deflate/br décompressés à la volée)
+    - archive disque optionnelle (ResponseStore) : GET revalidés par ETag / Last-Modified,
+      servis sans réseau si plus jeunes que store_ttl, ou toujours en mode offline
+
+    API sync (appelable depuis n'importe quel thread, sauf la boucle elle-même) :
+    fetch(url), fetch_many(urls), iter_fetch(urls).
+    API async : afetch(url).
+    """
+
+    def __init__(
+        self,
+        max_connections: int | None = None,
+        per_host: int = 8,
+        timeout: float = 20,
+        retries: int = 3,
+        backoff_base: float = 0.5,
+        headers: dict | None = None,
+        host_limits: dict | None = None,
+        max_response_bytes: int = MAX_RESPONSE_BYTES,
+        keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+        store: ResponseStore | None = None,
+        store_ttl: float = 0,
+        offline: bool = False,
+        limiter: RateLimiter | None = None,
+        throttle_retries: int = 5,
+    ):
+        # même dimensionnement que les pools de threads (parallel_map_offers),
+        # sans descendre sous la limite d'un host
+        if not max_connections:
+            max_connections = max(compute_offer_workers(10**6, io_bound=True), int(per_host))
+        self.max_connections = max(1, int(max_connections))
+        self.per_host = max(1, int(per_host))
+        self.timeout = float(timeout)
+        self.retries = max(1, int(retries))
+        self.backoff_base = float(backoff_base)
+        self.headers = dict(headers or DEFAULT_HEADERS)
+        self.host_limits = dict(host_limits or {})
+        self.max_response_bytes = max(1, int(max_response_bytes))
+        self.keepalive_timeout = float(keepalive_timeout)
+        self.store = store
+        self.store_ttl = float(store_ttl)
+        self.offline = bool(offline)
+        self.limiter = limiter
+        self.throttle_retries = max(0, int(throttle_retries))
+
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._host_sems = {}
+        self._start_lock = threading.Lock()
+
+    # ---------- Boucle / session ----------
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._loop is not None and self._thread.is_alive():
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def _run():
+                asyncio.set_event_loop(loop)
+                ready.set()
+                loop.run_forever()
+
+            thread = threading.Thread(target=_run, name="http-engine", daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread = loop, thread
+            self._session = None
+            self._host_sems = {}
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # toujours appelé depuis la boucle du moteur
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        sem = self._host_sems.get(host)
+        if sem is None:
+            sem = asyncio.Semaphore(int(self.host_limits.get(host, self.per_host)))
+            self._host_sems[host] = sem
+        return sem
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_base * (2 ** attempt) + random.uniform(0, self.backoff_base)
+
+    async def _read_capped(self, resp) -> bytes | None:
+        """Lit le corps (décompressé) ; None si la taille dépasse max_response_bytes."""
+        if (resp.content_length or 0) > self.max_response_bytes and not resp.headers.get("Content-Encoding"):
+            return None
+        chunks = []
+        size = 0
+        async for chunk in resp.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if size > self.max_response_bytes:
+                return None
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    @staticmethod
+    def _decode(body: bytes, charset: str | None) -> str:
+        """Charset annoncé par le serveur, utf-8 s'il est absent ou inconnu de Python."""
+        try:
+            return body.decode(charset or "utf-8", errors="replace")
+        except LookupError:
+            return body.decode("utf-8", errors="replace")
+
+    # ---------- API async ----------
+
+    async def afetch(
+        self,
+        url: str,
+        method: str = "GET",
+        headers: dict | None = None,
+        params: dict | None = None,
+        json_body=None,
+        data=None,
+    ) -> FetchResult:
+        """Ne lève jamais : en cas d'échec final, FetchResult.error est renseigné."""
+        # seuls les GET "simples" passent par l'archive (pas de POST / params)
+        use_store = self.store is not None and method == "GET" and not params and json_body is None and data is None
+        entry = None
+        if use_store:
+            try:
+                entry = await asyncio.to_thread(self.store.get, url)
+            except Exception as e:
+                return FetchResult(url, 0, "", {}, error=f"Archive illisible : {type(e).__name__}: {e}")
+            fresh = entry is not None and (time.time() - entry["fetched_at"]) < self.store_ttl
+            if entry is not None and (self.offline or fresh):
+                return FetchResult(url, entry["status"], entry["text"], {}, from_cache=True)
+        if self.offline:
+            return FetchResult(url, 0, "", {}, error="Mode hors-ligne : réponse absente de l'archive")
+
+        if entry is not None:
+            headers = {**(headers or {}), **ResponseStore.conditional_headers(entry)}
+
+        session = self._get_session()
+        limiter = self.limiter
+        last_error = None
+        attempt = 0
+        throttled = 0
+
+        while attempt < self.retries:
+            if limiter is not None:
+                await limiter.acquire(url)
+            try:
+                async with self._host_semaphore(url):
+                    async with session.request(
+                        method, url, headers=headers, params=params, json=json_body, data=data
+                    ) as resp:
+                        if resp.status == 304 and entry is not None:
+                            try:
+                                await asyncio.to_thread(self.store.touch, url)
+                            except Exception as e:
+                                print(f"[HTTP] Archivage impossible pour {url} : {e}")
+                            if limiter is not None:
+                                limiter.on_success(url)
+                            return FetchResult(url, entry["status"], entry["text"], dict(resp.headers), from_cache=True)
+
+                        body = await self._read_capped(resp)
+                        if body is None:
+                            return FetchResult(
+                                str(resp.url), resp.status, "", dict(resp.headers),
+                                error=f"Réponse > {self.max_response_bytes} octets",
+                            )
+                        text = self._decode(body, resp.charset)
+                        result = FetchResult(str(resp.url), resp.status, text, dict(resp.headers))
+
+                # site saturé : on ralentit le host (Retry-After gèle le bucket) sans consommer de retry
+                if resp.status in THROTTLE_STATUSES and throttled < self.throttle_retries:
+                    throttled += 1
+                    last_error = f"HTTP {resp.status}"
+                    retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+                    if limiter is not None:
+                        limiter.on_throttle(url, retry_after)
+                        limiter.record_retry(url)
+                    if retry_after is None:
+                        await asyncio.sleep(self._backoff(min(throttled, 4)))
+                    continue
+
+                if resp.status in RETRY_STATUSES and attempt < self.retries - 1:
+                    last_error = f"HTTP {resp.status}"
+                    attempt += 1
+                    if limiter is not None:
+                        limiter.record_retry(url)
+                    await asyncio.sleep(self._backoff(attempt - 1))
+                    continue
+
+                if limiter is not None:
+                    if resp.status in RETRY_STATUSES:
+                        limiter.record_failure(url)
+                    else:
+                        limiter.on_success(url)
+
+                if use_store and resp.status == 200:
+                    try:
+                        await asyncio.to_thread(self.store.put, url, text, resp.status, result.headers)
+                    except Exception as e:
+                        print(f"[HTTP] Archivage impossible pour {url} : {e}")
+                return result
+
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                last_error = f"{type(e).__name__}: {e}"
+                attempt += 1
+                if attempt < self.retries:
+                    if limiter is not None:
+                        limiter.record_retry(url)
+                    await asyncio.sleep(self._backoff(attempt - 1))
+
+        if limiter is not None:
+            limiter.record_failure(url)
+        return FetchResult(url, 0, "", {}, error=str(last_error))
+
+    # ---------- API sync ----------
+
+    def submit(self, coro):
+        """Planifie une coroutine sur la boucle du moteur => concurrent.futures.Future."""
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def fetch(self, url: str, **kwargs) -> FetchResult:
+        return self.submit(self.afetch(url, **kwargs)).result()
+
+    def fetch_many(self, urls, **kwargs) -> list[FetchResult]:
+        """Résultats dans l'ordre des urls."""
+        futures = [self.submit(self.afetch(u, **kwargs)) for u in urls]
+        return [f.result() for f in futures]
+
+    def iter_fetch(self, urls, max_in_flight: int | None = None, **kwargs):
+        """
+        Génère (url, FetchResult) dans l'ordre d'arrivée (le parsing peut démarrer tout de suite).
+        max_in_flight borne le nombre de requêtes soumises en même temps (fenêtre glissante).
+        """
+        pending_urls = iter(list(urls))
+        in_flight = {}
+        done_q = queue.Queue()
+
+        def _fill():
+            while max_in_flight is None or len(in_flight) < max_in_flight:
+                url = next(pending_urls, None)
+                if url is None:
+                    return
+                fut = self.submit(self.afetch(url, **kwargs))
+                in_flight[fut] = url
+                fut.add_done_callback(done_q.put)
+
+        try:
+            _fill()
+            while in_flight:
+                fut = done_q.get()
+                url = in_flight.pop(fut)
+                yield url, fut.result()
+                _fill()
+        finally:
+            for fut in in_flight:
+                fut.cancel()
+
+    def close(self) -> None:
+        if self.store is not None:
+            self.store.close()
+        if self._loop is None:
+            return
+
+        async def _close_session():
+            if self._session is not None and not self._session.closed:
+                await self._session.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close_session(), self._loop).result(timeout=5)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+        self._session = None
+
+
+# ==========================
+# MOTEUR PARTAGÉ (par process)
+# ==========================
+_ENGINE = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def _default_store_dir(config_file: str) -> str:
+    """
+    Archive à côté des données du profil (data/http_cache, comme data/cache_<profil>.sqlite),
+    à défaut à côté du fichier de config : jamais relative au dossier de lancement.
+    """
+    data_file = os.getenv("JOB_DATA_FILE")
+    anchor = data_file if data_file else config_file
+    return os.path.join(os.path.dirname(os.path.abspath(anchor)), "http_cache")
+
+
+def _read_engine_config() -> dict:
+    config_file = config_path()
+    config = read_config()
+
+    store = None
+    offline = bool(config.get("http_offline", False) or config.get("http_replay", False))
+    # archive opt-in ("http_cache") : elle grossit à chaque run, jusqu'à l'éviction par âge
+    if config.get("http_cache", False) or offline:
+        try:
+            store = ResponseStore(config.get("http_cache_dir") or _default_store_dir(config_file))
+        except Exception as e:
+            print(f"[HTTP] Archive des réponses désactivée : {e}")
+
+    return {
+        "store": store,
+        "store_ttl": float(config.get("http_cache_ttl", 0) or 0),
+        "offline": offline,
+        "max_connections": int(config.get("http_max_connections", 0) or 0) or None,
+        "per_host": int(config.get("http_per_host", 8) or 8),
+        "timeout": float(config.get("http_timeout", 20) or 20),
+        "retries": int(config.get("http_retries", 3) or 3),
+        "max_response_bytes": int(config.get("http_max_response_bytes", MAX_RESPONSE_BYTES) or MAX_RESPONSE_BYTES),
+        "throttle_retries": int(config.get("http_throttle_retries", 5) or 0),
+        "limiter": get_rate_limiter(),
+    }
+
+
+def get_http_engine() -> HttpEngine:
+    """Moteur partagé par Linkedin, ServicePublic et JobFinder.get_content."""
+    global _ENGINE
+    with _ENGINE_LOCK:
+        if _ENGINE is None:
+            _ENGINE = HttpEngine(**_read_engine_config())
+        return _ENGINE
+
+
+def close_http_engine() -> None:
+    global _ENGINE
+    with _ENGINE_LOCK:
+        engine, _ENGINE = _ENGINE, None
+    if engine is not None:
+        engine.close()
+
+
+atexit.register(close_http_engine)
@@ -0,0 +1,113 @@
+from scraping.config import read_config
+
+
+# opt-in : arrêt anticipé et tri par date (LinkedIn sortBy=DD, Apec) changent les résultats d'un run
+DEFAULT_INCREMENTAL_MODE = False
+DEFAULT_KNOWN_STREAK = 20
+DEFAULT_KNOWN_PAGES = 2
+
+
+def _read_incremental_config() -> tuple[bool, int, int]:
+    config = read_config()
+    enabled = bool(config.get("incremental_mode", DEFAULT_INCREMENTAL_MODE))
+    streak = int(config.get("incremental_known_streak", DEFAULT_KNOWN_STREAK) or DEFAULT_KNOWN_STREAK)
+    pages = int(config.get("incremental_known_pages", DEFAULT_KNOWN_PAGES) or DEFAULT_KNOWN_PAGES)
+    return enabled, max(1, streak), max(1, pages)
+
+
+def incremental_enabled() -> bool:
+    """Mode incrémental actif ? (les scrapers trient alors par date quand le site le permet)"""
+    return _read_incremental_config()[0]
+
+
+class IncrementalGuard:
+    """
+    Arrêt anticipé de la pagination d'une recherche (source + requête).
+
+    - page(offer_ids) à chaque page de listing, dans l'ordre => True s'il faut s'arrêter
+    - arrêt si une page répète la précédente (toujours actif)
+    - si un run complet précédent a posé un watermark (mode incrémental) :
+      arrêt après `known_streak` cartes connues d'affilée, `known_pages` pages entièrement connues,
+      ou dès qu'on retombe sur l'offre la plus récente du run précédent (résultats triés par date)
+    - finish() enregistre le nouveau watermark dans OfferCache
+    """
+
+    def __init__(self, cache, source: str, query: str, sorted_by_date: bool = False, enabled: bool | None = None):
+        cfg_enabled, self.known_streak, self.known_pages = _read_incremental_config()
+        self.enabled = cfg_enabled if enabled is None else bool(enabled)
+        self.cache = cache
+        self.source = source
+        self.query = query or ""
+        self.sorted_by_date = sorted_by_date
+
+        self.watermark = None
+        if cache is not None and self.enabled:
+            try:
+                self.watermark = cache.get_watermark(source, self.query)
+            except Exception:
+                self.watermark = None
+        self.active = self.watermark is not None
+
+        self.newest_offer_id = ""
+        self.newest_date = ""
+        self.stop_reason = ""
+        self._previous_page = None
+        self._streak = 0
+        self._known_pages = 0
+        self._seen = set()
+
+    def _known_flags(self, offer_ids: list[str], unknown: set | None) -> list[bool]:
+        # une seule requête pour la page (sauf si l'appelant a déjà filtré les IDs inconnus)
+        if unknown is None:
+            unknown = set(self.cache.filter_unknown(offer_ids)) if self.cache is not None else set(offer_ids)
+        return [oid in self._seen or oid not in unknown for oid in offer_ids]
+
+    def _stop(self, reason: str) -> bool:
+        self.stop_reason = reason
+        print(f"[INCR] {self.source} : arrêt de la pagination ({reason}).")
+        return True
+
+    def page(self, offer_ids: list[str], dates: list[str] | None = None, unknown: set | None = None) -> bool:
+        """
+        À appeler AVANT d'insérer les cartes de la page dans le cache.
+        unknown : IDs de la page absents du cache, si l'appelant vient de les calculer (filter_unknown).
+        """
+        offer_ids = [oid for oid in offer_ids if oid]
+        if not offer_ids:
+            return False
+
+        if not self.newest_offer_id:
+            self.newest_offer_id = offer_ids[0]
+            self.newest_date = (dates or [""])[0] or ""
+
+        current = tuple(offer_ids)
+        if current == self._previous_page:
+            return self._stop("page identique à la précédente")
+        self._previous_page = current
+
+        # sans watermark, seul le test de page répétée compte : pas de requête au cache
+        known = self._known_flags(offer_ids, unknown) if self.active else []
+        self._seen.update(offer_ids)
+        if not self.active:
+            return False
+
+        for oid, is_known in zip(offer_ids, known):
+            if self.sorted_by_date and oid == self.watermark["last_offer_id"]:
+                return self._stop("watermark du run précédent atteint")
+            self._streak = self._streak + 1 if is_known else 0
+            if self._streak >= self.known_streak:
+                return self._stop(f"{self._streak} offres connues d'affilée")
+
+        self._known_pages = self._known_pages + 1 if all(known) else 0
+        if self._known_pages >= self.known_pages:
+            return self._stop(f"{self._known_pages} pages entièrement connues")
+        return False
+
+    def finish(self) -> None:
+        """Listing terminé (complet ou arrêté) : l'offre la plus récente devient le watermark."""
+        if self.cache is None or not self.newest_offer_id:
+            return
+        try:
+            self.cache.set_watermark(self.source, self.query, self.newest_offer_id, self.newest_date)
+        except Exception as e:
+            print(f"[INCR] {self.source} : watermark non enregistré : {e}")
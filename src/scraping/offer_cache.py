@@ -1,7 +1,163 @@
 import os
 import sqlite3
+import threading
 import time
-from typing import Optional, List, Dict, Any
+import zlib
+from typing import Optional, List, Dict, Any, Iterable, Iterator
+
+from scraping.known_ids import KnownIdIndex
+from scraping.cache_writer import CacheWriter
+
+
+# Requêtes partagées par les API unitaires et par lot (même texte SQL => même statement préparé)
+_UPSERT_URL_SQL = """
+    INSERT INTO offers(offer_id, source, url, status, updated_at)
+    VALUES(?, ?, ?, ?, ?)
+    ON CONFLICT(offer_id) DO UPDATE SET
+        source=excluded.source,
+        url=excluded.url,
+        status=excluded.status,
+        updated_at=excluded.updated_at
+"""
+
+_UPSERT_DETAIL_SQL = """
+    INSERT INTO offers(offer_id, source, url, title, has_body, status, updated_at)
+    VALUES(?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(offer_id) DO UPDATE SET
+        source=excluded.source,
+        url=excluded.url,
+        title=excluded.title,
+        has_body=excluded.has_body,
+        status=excluded.status,
+        updated_at=excluded.updated_at
+"""
+
+# Descriptions compressées (zlib) dans offer_bodies : les requêtes de métadonnées ne lisent jamais les blobs
+_UPSERT_BODY_SQL = """
+    INSERT INTO offer_bodies(offer_id, body) VALUES(?, ?)
+    ON CONFLICT(offer_id) DO UPDATE SET body=excluded.body
+"""
+
+_DELETE_BODY_SQL = "DELETE FROM offer_bodies WHERE offer_id = ?"
+
+_BODY_COMPRESSION_LEVEL = 6
+
+# colonnes d'une offre (alias o), + b.body si la description est demandée (LEFT JOIN offer_bodies b)
+_OFFER_COLUMNS = "o.offer_id, o.source, o.url, o.title, o.status, o.score, o.is_good, o.updated_at"
+
+
+def _compress(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), _BODY_COMPRESSION_LEVEL)
+
+
+def _decompress(body) -> str:
+    return zlib.decompress(body).decode("utf-8") if body else ""
+
+
+def _offer_select(with_description: bool) -> str:
+    if with_description:
+        return f"SELECT {_OFFER_COLUMNS}, b.body FROM offers o LEFT JOIN offer_bodies b ON b.offer_id = o.offer_id"
+    return f"SELECT {_OFFER_COLUMNS} FROM offers o"
+
+
+def _offer_row(row) -> Dict[str, Any]:
+    """Ligne SQL -> dict ; la description n'est décompressée que si elle a été sélectionnée."""
+    d = dict(row)
+    if "body" in d:
+        d["description"] = _decompress(d.pop("body"))
+    return d
+
+
+def _move_descriptions_to_bodies(con: sqlite3.Connection) -> None:
+    """Migration 2 : descriptions en clair de `offers` -> offer_bodies compressées (par paquets)."""
+    cur = con.execute("SELECT offer_id, description FROM offers WHERE COALESCE(description, '') <> ''")
+    while True:
+        rows = cur.fetchmany(500)
+        if not rows:
+            break
+        con.executemany(_UPSERT_BODY_SQL, [(r[0], _compress(r[1])) for r in rows])
+    con.execute("UPDATE offers SET has_body = 1, description = NULL WHERE COALESCE(description, '') <> ''")
+
+
+_SET_SCORING_SQL = """
+    UPDATE offers
+    SET score=?, is_good=?, status=?, updated_at=?
+    WHERE offer_id=?
+"""
+
+# au-delà, les IDs passent par une table temporaire (limite de paramètres SQLite)
+_IN_CLAUSE_MAX = 500
+
+# Migrations du schéma (numérotées via PRAGMA user_version), appliquées une fois et dans l'ordre
+_MIGRATIONS = [
+    (
+        1,
+        [
+            # WHERE status = ? ORDER BY updated_at (listes, reprise, itération par clé) : sans tri
+            "CREATE INDEX IF NOT EXISTS idx_offers_status_updated ON offers(status, updated_at, offer_id)",
+            "DROP INDEX IF EXISTS idx_offers_status",
+            # rollback des faux refus : index partiel limité aux seules lignes candidates
+            """
+            CREATE INDEX IF NOT EXISTS idx_offers_rollback ON offers(offer_id)
+            WHERE status = 'SCORED_BLACK'
+              AND COALESCE(score, 0) = 0
+              AND COALESCE(is_good, 0) = 0
+              AND COALESCE(title, '') <> ''
+              AND COALESCE(description, '') <> ''
+            """,
+        ],
+    ),
+    (
+        2,
+        [
+            # descriptions hors de la table offers (colonne `description` conservée, toujours vide)
+            "ALTER TABLE offers ADD COLUMN has_body INTEGER NOT NULL DEFAULT 0",
+            "CREATE TABLE IF NOT EXISTS offer_bodies (offer_id TEXT PRIMARY KEY, body BLOB NOT NULL)",
+            _move_descriptions_to_bodies,
+            """
+            CREATE TRIGGER IF NOT EXISTS trg_offers_delete_body AFTER DELETE ON offers
+            BEGIN
+                DELETE FROM offer_bodies WHERE offer_id = OLD.offer_id;
+            END
+            """,
+            "DROP INDEX IF EXISTS idx_offers_rollback",
+            """
+            CREATE INDEX IF NOT EXISTS idx_offers_rollback ON offers(offer_id)
+            WHERE status = 'SCORED_BLACK'
+              AND COALESCE(score, 0) = 0
+              AND COALESCE(is_good, 0) = 0
+              AND COALESCE(title, '') <> ''
+              AND has_body = 1
+            """,
+        ],
+    ),
+]
+
+# Compteurs par statut tenus à jour par SQLite (même transaction que l'écriture de l'offre)
+_STATUS_COUNT_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_offers_count_insert AFTER INSERT ON offers
+    BEGIN
+        INSERT INTO status_counts(status, n) VALUES(NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET n = n + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_offers_count_delete AFTER DELETE ON offers
+    BEGIN
+        UPDATE status_counts SET n = n - 1 WHERE status = OLD.status;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_offers_count_update AFTER UPDATE OF status ON offers
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        UPDATE status_counts SET n = n - 1 WHERE status = OLD.status;
+        INSERT INTO status_counts(status, n) VALUES(NEW.status, 1)
+        ON CONFLICT(status) DO UPDATE SET n = n + 1;
+    END
+    """,
+]
 
 
 class OfferCache:
@@ -14,23 +170,130 @@ class OfferCache:
     - SCORED_BLACK : scoré + blacklist
     - WHITE/BLACK/KNOWN : bootstrap historique (figé)
     - ERROR_DETAIL : erreur lors du fetch détail
+
+    Descriptions : compressées (zlib) dans offer_bodies ; get_offer / list_* / iter_by_status ne les
+    lisent et ne les décompressent que si with_description=True (défaut), get_description(offer_id) sinon.
+
+    Écritures : synchrones par défaut ; après start_writer(), déposées dans la queue d'un thread
+    d'écriture unique (transactions groupées). Les lectures voient l'état au dernier flush() :
+    à appeler aux frontières d'étape (close() flushe aussi).
+
+    Connexions : une connexion persistante par thread (PRAGMA posés une fois à l'ouverture,
+    requêtes préparées réutilisées via le cache de statements de sqlite3).
+    close() / `with OfferCache(...) as cache:` ferment toutes les connexions ; un usage
+    ultérieur en rouvre une.
+
+    Index mémoire : après preload_known_ids(), exists() / filter_unknown() répondent sans SQL
+    (index alimenté par chaque insertion de cette instance, partagé par tous les threads).
     """
 
+    STATEMENT_CACHE_SIZE = 256
+
+    # fichiers dont le schéma a déjà été vérifié dans ce process (reruns Streamlit : pas de DDL répété)
+    _initialized_paths = set()
+    _initialized_lock = threading.Lock()
+
     def __init__(self, db_path: str):
         os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
         self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._generation = 0
+        self._known = None  # KnownIdIndex, chargé par preload_known_ids()
+        self._writer = None  # CacheWriter, démarré par start_writer()
         self._init_db()
 
-    def _connect(self) -> sqlite3.Connection:
-        con = sqlite3.connect(self.db_path, timeout=30)
+    def _open(self) -> sqlite3.Connection:
+        # check_same_thread=False : chaque connexion reste propre à son thread,
+        # mais close() doit pouvoir les fermer depuis le thread principal
+        con = sqlite3.connect(
+            self.db_path,
+            timeout=30,
+            check_same_thread=False,
+            cached_statements=self.STATEMENT_CACHE_SIZE,
+        )
         con.row_factory = sqlite3.Row
-        con.execute("PRAGMA journal_mode=WAL;")
         con.execute("PRAGMA synchronous=NORMAL;")
         con.execute("PRAGMA temp_store=MEMORY;")
         return con
 
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Connexion du thread courant (ouverte au premier appel).
+        `with self._connect() as con:` = une transaction (commit / rollback), sans fermer la connexion.
+        """
+        local = self._local
+        con = getattr(local, "con", None)
+        if con is None or getattr(local, "generation", -1) != self._generation:
+            con = self._open()
+            with self._connections_lock:
+                self._connections.append(con)
+                local.con, local.generation = con, self._generation
+        return con
+
+    # ---------- Thread d'écriture ----------
+
+    def start_writer(self, max_queue: int = 2000, batch_size: int = 200, interval: float = 0.2) -> None:
+        """Écritures asynchrones : dépôt dans une queue bornée, commit groupé par un thread unique."""
+        if self._writer is None:
+            self._writer = CacheWriter(self._connect, max_queue=max_queue, batch_size=batch_size, interval=interval)
+
+    def flush(self) -> None:
+        """Attend que toutes les écritures déposées soient commitées (no-op en mode synchrone)."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def stop_writer(self) -> None:
+        writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.close()
+            if writer.failed:
+                print(f"[CACHE] {writer.failed} écritures en échec sur {writer.committed + writer.failed}.")
+
+    def _write(self, op) -> None:
+        """op(con) : via le thread d'écriture s'il tourne, sinon dans une transaction immédiate."""
+        writer = self._writer
+        if writer is not None:
+            writer.submit(op)
+            return
+        with self._connect() as con:
+            op(con)
+
+    def close(self) -> None:
+        """Flush des écritures en attente puis fermeture des connexions de tous les threads (fin de run)."""
+        self.stop_writer()
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        # le fichier peut être modifié ailleurs entre deux runs : index rechargé au prochain preload
+        self._known = None
+        for con in connections:
+            try:
+                con.close()
+            except Exception:
+                pass
+
+    def __enter__(self) -> "OfferCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
     def _init_db(self) -> None:
+        key = os.path.abspath(self.db_path)
+        with OfferCache._initialized_lock:
+            if key in OfferCache._initialized_paths and os.path.exists(self.db_path):
+                return
+            self._create_schema()
+            OfferCache._initialized_paths.add(key)
+
+    def _create_schema(self) -> None:
         with self._connect() as con:
+            # WAL est persistant dans le fichier : posé une seule fois, à l'ouverture du cache
+            con.execute("PRAGMA journal_mode=WAL;")
+            # schéma + initialisation des compteurs atomiques (plusieurs process peuvent ouvrir le cache)
+            con.execute("BEGIN IMMEDIATE")
             con.execute(
                 """
                 CREATE TABLE IF NOT EXISTS offers (
@@ -38,7 +301,7 @@ class OfferCache:
                     source      TEXT NOT NULL,
                     url         TEXT NOT NULL,
                     title       TEXT,
-                    description TEXT,
+                    description TEXT,  -- historique : vide depuis la migration 2 (offer_bodies)
                     status      TEXT NOT NULL,
                     score       INTEGER,
                     is_good     INTEGER,
@@ -47,13 +310,90 @@ class OfferCache:
                 """
             )
             con.execute("CREATE INDEX IF NOT EXISTS idx_offers_source ON offers(source);")
-            con.execute("CREATE INDEX IF NOT EXISTS idx_offers_status ON offers(status);")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS watermarks (
+                    source         TEXT NOT NULL,
+                    query          TEXT NOT NULL,
+                    last_offer_id  TEXT NOT NULL,
+                    last_date      TEXT,
+                    updated_at     INTEGER NOT NULL,
+                    PRIMARY KEY (source, query)
+                )
+                """
+            )
+
+            has_counts = con.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'status_counts'"
+            ).fetchone()
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS status_counts (
+                    status  TEXT PRIMARY KEY,
+                    n       INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            for trigger in _STATUS_COUNT_TRIGGERS:
+                con.execute(trigger)
+            if not has_counts:
+                # cache existant : compteurs initialisés une fois, les triggers prennent le relais
+                con.execute(
+                    "INSERT INTO status_counts(status, n) SELECT status, COUNT(1) FROM offers GROUP BY status"
+                )
+
+            applied = self._migrate(con)
+
+        if 2 in applied:
+            # descriptions déplacées et compressées : on rend la place libérée (hors transaction)
+            con.execute("VACUUM")
+            con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    @staticmethod
+    def _migrate(con: sqlite3.Connection) -> List[int]:
+        """Applique les migrations manquantes (dans la transaction de création du schéma)."""
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+        applied = []
+        for target, steps in _MIGRATIONS:
+            if version >= target:
+                continue
+            for step in steps:
+                if callable(step):
+                    step(con)
+                else:
+                    con.execute(step)
+            con.execute(f"PRAGMA user_version = {int(target)}")
+            version = target
+            applied.append(target)
+            print(f"[CACHE] Migration du schéma OfferCache -> v{target}")
+        return applied
+
+    # ---------- Index mémoire des IDs connus ----------
+
+    def preload_known_ids(self) -> int:
+        """Charge tous les offer_id en mémoire (une lecture par run) ; renvoie leur nombre."""
+        index = KnownIdIndex()
+        with self._connect() as con:
+            cur = con.execute("SELECT offer_id FROM offers")
+            while True:
+                rows = cur.fetchmany(10000)
+                if not rows:
+                    break
+                index.add_many(r[0] for r in rows)
+        self._known = index
+        return len(index)
+
+    def _remember(self, offer_ids) -> None:
+        if self._known is not None:
+            self._known.add_many(offer_ids)
 
     # ---------- Core API ----------
 
     def exists(self, offer_id: str) -> bool:
         if not offer_id:
             return False
+        if self._known is not None:
+            return offer_id in self._known
         with self._connect() as con:
             row = con.execute(
                 "SELECT 1 FROM offers WHERE offer_id = ? LIMIT 1", (offer_id,)
@@ -69,32 +409,37 @@ class OfferCache:
             ).fetchone()
         return row["status"] if row else None
 
-    def get_offer(self, offer_id: str) -> Optional[Dict[str, Any]]:
+    def get_offer(self, offer_id: str, with_description: bool = True) -> Optional[Dict[str, Any]]:
         if not offer_id:
             return None
         with self._connect() as con:
             row = con.execute(
-                "SELECT offer_id, source, url, title, description, status, score, is_good, updated_at "
-                "FROM offers WHERE offer_id = ?",
-                (offer_id,),
+                f"{_offer_select(with_description)} WHERE o.offer_id = ?", (offer_id,)
             ).fetchone()
-        return dict(row) if row else None
+        return _offer_row(row) if row else None
 
-    def upsert_url(self, offer_id: str, source: str, url: str, status: str) -> None:
-        now = int(time.time())
+    def get_description(self, offer_id: str) -> str:
+        """Description décompressée d'une offre ("" si absente)."""
+        if not offer_id:
+            return ""
         with self._connect() as con:
-            con.execute(
-                """
-                INSERT INTO offers(offer_id, source, url, status, updated_at)
-                VALUES(?, ?, ?, ?, ?)
-                ON CONFLICT(offer_id) DO UPDATE SET
-                    source=excluded.source,
-                    url=excluded.url,
-                    status=excluded.status,
-                    updated_at=excluded.updated_at
-                """,
-                (offer_id, source, url, status, now),
-            )
+            row = con.execute("SELECT body FROM offer_bodies WHERE offer_id = ?", (offer_id,)).fetchone()
+        return _decompress(row["body"]) if row else ""
+
+    @staticmethod
+    def _write_details(con: sqlite3.Connection, params: list) -> None:
+        """params : (offer_id, source, url, title, description, status, updated_at)."""
+        con.executemany(
+            _UPSERT_DETAIL_SQL,
+            [(oid, src, url, title, 1 if desc else 0, status, now) for (oid, src, url, title, desc, status, now) in params],
+        )
+        con.executemany(_UPSERT_BODY_SQL, [(p[0], _compress(p[4])) for p in params if p[4]])
+        con.executemany(_DELETE_BODY_SQL, [(p[0],) for p in params if not p[4]])
+
+    def upsert_url(self, offer_id: str, source: str, url: str, status: str) -> None:
+        params = (offer_id, source, url, status, int(time.time()))
+        self._write(lambda con: con.execute(_UPSERT_URL_SQL, params))
+        self._remember([offer_id])
 
     def upsert_detail(
         self,
@@ -105,75 +450,163 @@ class OfferCache:
         description: str,
         status: str = "DETAILED",
     ) -> None:
-        now = int(time.time())
-        with self._connect() as con:
-            con.execute(
-                """
-                INSERT INTO offers(offer_id, source, url, title, description, status, updated_at)
-                VALUES(?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(offer_id) DO UPDATE SET
-                    source=excluded.source,
-                    url=excluded.url,
-                    title=excluded.title,
-                    description=excluded.description,
-                    status=excluded.status,
-                    updated_at=excluded.updated_at
-                """,
-                (offer_id, source, url, title, description, status, now),
-            )
+        params = [(offer_id, source, url, title, description or "", status, int(time.time()))]
+        self._write(lambda con: self._write_details(con, params))
+        self._remember([offer_id])
 
     def set_scoring(self, offer_id: str, score: int, is_good: int, status: str) -> None:
-        now = int(time.time())
-        with self._connect() as con:
-            con.execute(
-                """
-                UPDATE offers
-                SET score=?, is_good=?, status=?, updated_at=?
-                WHERE offer_id=?
-                """,
-                (int(score), int(is_good), status, now, offer_id),
-            )
+        params = (int(score), int(is_good), status, int(time.time()), offer_id)
+        self._write(lambda con: con.execute(_SET_SCORING_SQL, params))
 
     def mark_error(self, offer_id: str, status: str = "ERROR_DETAIL") -> None:
-        now = int(time.time())
-        with self._connect() as con:
-            con.execute(
-                "UPDATE offers SET status=?, updated_at=? WHERE offer_id=?",
-                (status, now, offer_id),
-            )
+        params = (status, int(time.time()), offer_id)
+        self._write(lambda con: con.execute("UPDATE offers SET status=?, updated_at=? WHERE offer_id=?", params))
 
     def should_fetch_detail(self, offer_id: str) -> bool:
         return not self.exists(offer_id)
 
+    # ---------- API par lot (une transaction par appel) ----------
+
+    def filter_unknown(self, offer_ids: Iterable[str]) -> List[str]:
+        """
+        IDs absents du cache, dans l'ordre d'entrée et sans doublons : une requête pour toute
+        une page de listing (IN (...) ; table temporaire au-delà de _IN_CLAUSE_MAX IDs).
+        """
+        if self._known is not None:
+            return self._known.filter_unknown(offer_ids)
+
+        ids = list(dict.fromkeys(str(oid) for oid in offer_ids if oid))
+        if not ids:
+            return []
+
+        with self._connect() as con:
+            if len(ids) <= _IN_CLAUSE_MAX:
+                placeholders = ",".join(["?"] * len(ids))
+                rows = con.execute(
+                    f"SELECT offer_id FROM offers WHERE offer_id IN ({placeholders})", ids
+                ).fetchall()
+            else:
+                con.execute("CREATE TEMP TABLE IF NOT EXISTS _lookup_ids (offer_id TEXT PRIMARY KEY)")
+                con.execute("DELETE FROM _lookup_ids")
+                con.executemany("INSERT OR IGNORE INTO _lookup_ids(offer_id) VALUES(?)", [(i,) for i in ids])
+                rows = con.execute(
+                    "SELECT o.offer_id FROM offers o JOIN _lookup_ids l ON l.offer_id = o.offer_id"
+                ).fetchall()
+                con.execute("DELETE FROM _lookup_ids")
+
+        known = {r["offer_id"] for r in rows}
+        return [oid for oid in ids if oid not in known]
+
+    def upsert_urls_many(self, rows: Iterable[tuple]) -> int:
+        """rows : (offer_id, source, url, status) ; renvoie le nombre de lignes écrites."""
+        now = int(time.time())
+        params = [(str(oid), source, url, status, now) for (oid, source, url, status) in rows if oid]
+        if not params:
+            return 0
+        self._write(lambda con: con.executemany(_UPSERT_URL_SQL, params))
+        self._remember(p[0] for p in params)
+        return len(params)
+
+    def upsert_details_many(self, rows: Iterable[tuple]) -> int:
+        """rows : (offer_id, source, url, title, description, status) ; renvoie le nombre de lignes écrites."""
+        now = int(time.time())
+        params = [
+            (str(oid), source, url, title, description or "", status, now)
+            for (oid, source, url, title, description, status) in rows
+            if oid
+        ]
+        if not params:
+            return 0
+        self._write(lambda con: self._write_details(con, params))
+        self._remember(p[0] for p in params)
+        return len(params)
+
+    def set_scoring_many(self, rows: Iterable[tuple]) -> int:
+        """rows : (offer_id, score, is_good, status) ; renvoie le nombre de lignes écrites."""
+        now = int(time.time())
+        params = [(int(score), int(is_good), status, now, str(oid)) for (oid, score, is_good, status) in rows if oid]
+        if not params:
+            return 0
+        self._write(lambda con: con.executemany(_SET_SCORING_SQL, params))
+        return len(params)
+
     # ---------- Listing / reprise ----------
 
-    def list_by_status(self, status: str, limit: int = 500) -> List[Dict[str, Any]]:
+    def list_by_status(self, status: str, limit: int = 500, with_description: bool = True) -> List[Dict[str, Any]]:
         with self._connect() as con:
             rows = con.execute(
-                """
-                SELECT offer_id, source, url, title, description, status, score, is_good, updated_at
-                FROM offers
-                WHERE status = ?
-                ORDER BY updated_at ASC
+                f"""
+                {_offer_select(with_description)}
+                WHERE o.status = ?
+                ORDER BY o.updated_at ASC
                 LIMIT ?
                 """,
                 (status, int(limit)),
             ).fetchall()
-        return [dict(r) for r in rows]
+        return [_offer_row(r) for r in rows]
+
+    def iter_by_status(
+        self, status: str, limit: Optional[int] = None, batch_size: int = 200, with_description: bool = True
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Offres d'un statut, des plus anciennes aux plus récentes, en flux : pagination par clé
+        (updated_at, offer_id) sur idx_offers_status_updated, `batch_size` lignes en mémoire au plus.
+        Une offre qui change de statut pendant le parcours n'est ni rejouée ni ne décale les pages.
+        """
+        remaining = None if limit is None else int(limit)
+        last = (-1, "")
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            with self._connect() as con:
+                rows = con.execute(
+                    f"""
+                    {_offer_select(with_description)}
+                    WHERE o.status = ? AND (o.updated_at, o.offer_id) > (?, ?)
+                    ORDER BY o.updated_at ASC, o.offer_id ASC
+                    LIMIT ?
+                    """,
+                    (status, last[0], last[1], int(size)),
+                ).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield _offer_row(r)
+            last = (rows[-1]["updated_at"], rows[-1]["offer_id"])
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                return
+
+    def list_not_scored(self, limit: int = 1000, with_description: bool = True) -> List[Dict[str, Any]]:
+        return self.list_by_status("DETAILED", limit=limit, with_description=with_description)
+
+    # ---------- Watermarks (scraping incrémental) ----------
 
-    def list_not_scored(self, limit: int = 1000) -> List[Dict[str, Any]]:
+    def get_watermark(self, source: str, query: str) -> Optional[Dict[str, Any]]:
+        """Offre la plus récente vue au dernier run complet pour (source, requête)."""
         with self._connect() as con:
-            rows = con.execute(
+            row = con.execute(
+                "SELECT source, query, last_offer_id, last_date, updated_at FROM watermarks "
+                "WHERE source = ? AND query = ?",
+                (source, query),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def set_watermark(self, source: str, query: str, last_offer_id: str, last_date: str = "") -> None:
+        params = (source, query, last_offer_id, last_date or "", int(time.time()))
+        self._write(
+            lambda con: con.execute(
                 """
-                SELECT offer_id, source, url, title, description, status, score, is_good, updated_at
-                FROM offers
-                WHERE status IN ('DETAILED')
-                ORDER BY updated_at ASC
-                LIMIT ?
+                INSERT INTO watermarks(source, query, last_offer_id, last_date, updated_at)
+                VALUES(?, ?, ?, ?, ?)
+                ON CONFLICT(source, query) DO UPDATE SET
+                    last_offer_id=excluded.last_offer_id,
+                    last_date=excluded.last_date,
+                    updated_at=excluded.updated_at
                 """,
-                (int(limit),),
-            ).fetchall()
-        return [dict(r) for r in rows]
+                params,
+            )
+        )
 
     # ---------- Bootstrap ----------
 
@@ -182,19 +615,8 @@ class OfferCache:
             return
         now = int(time.time())
         rows = [(str(oid), source, "", status, now) for oid in offer_ids if oid]
-        with self._connect() as con:
-            con.executemany(
-                """
-                INSERT INTO offers(offer_id, source, url, status, updated_at)
-                VALUES(?, ?, ?, ?, ?)
-                ON CONFLICT(offer_id) DO UPDATE SET
-                    source=excluded.source,
-                    url=excluded.url,
-                    status=excluded.status,
-                    updated_at=excluded.updated_at
-                """,
-                rows,
-            )
+        self._write(lambda con: con.executemany(_UPSERT_URL_SQL, rows))
+        self._remember(r[0] for r in rows)
 
     # ---------- Rollback scoring KO ----------
 
@@ -203,17 +625,18 @@ class OfferCache:
         Corrige le cas "LLM KO => score=0/is_good=0 => SCORED_BLACK".
         On repasse en DETAILED pour re-scoring plus tard.
         """
+        self.flush()  # lecture + écriture synchrones : les écritures en attente passent d'abord
         now = int(time.time())
         with self._connect() as con:
             rows = con.execute(
                 """
                 SELECT offer_id
-                FROM offers
+                FROM offers INDEXED BY idx_offers_rollback
                 WHERE status = 'SCORED_BLACK'
                   AND COALESCE(score, 0) = 0
                   AND COALESCE(is_good, 0) = 0
                   AND COALESCE(title, '') <> ''
-                  AND COALESCE(description, '') <> ''
+                  AND has_body = 1
                 LIMIT ?
                 """,
                 (int(limit),),
@@ -231,21 +654,15 @@ class OfferCache:
 
     # ---------- Stats ----------
 
-    def count_by_status(self, status: str) -> int:
+    def counts(self) -> Dict[str, int]:
+        """{statut: nombre d'offres}, lu dans status_counts (maintenu par triggers) : une seule requête."""
         with self._connect() as con:
-            row = con.execute(
-                "SELECT COUNT(1) AS n FROM offers WHERE status = ?", (status,)
-            ).fetchone()
-        return int(row["n"] or 0) if row else 0
+            rows = con.execute("SELECT status, n FROM status_counts WHERE n > 0").fetchall()
+        return {r["status"]: int(r["n"]) for r in rows}
+
+    def count_by_status(self, status: str) -> int:
+        return self.counts().get(status, 0)
 
     def count_by_statuses(self, statuses: List[str]) -> int:
-        statuses = [s for s in (statuses or []) if s]
-        if not statuses:
-            return 0
-        placeholders = ",".join(["?"] * len(statuses))
-        with self._connect() as con:
-            row = con.execute(
-                f"SELECT COUNT(1) AS n FROM offers WHERE status IN ({placeholders})",
-                tuple(statuses),
-            ).fetchone()
-        return int(row["n"] or 0) if row else 0
+        counts = self.counts()
+        return sum(counts.get(s, 0) for s in set(statuses or []) if s)
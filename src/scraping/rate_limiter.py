@@ -0,0 +1,193 @@
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from scraping.config import read_config
+
+
+DEFAULT_RATE = 4.0  # requêtes / seconde / host au démarrage
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_BURST = 4
+# plafond de politesse du débit AIMD : DEFAULT_MAX_FACTOR x le débit de départ du host (sauf rate_limit_max)
+DEFAULT_MAX_FACTOR = 5.0
+# statuts qui signalent une surcharge côté site => décroissance multiplicative
+THROTTLE_STATUSES = {429, 503}
+# Retry-After plafonné (un site qui demande 1h ne doit pas geler tout le run)
+MAX_RETRY_AFTER = 120.0
+
+
+def host_of(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+
+def parse_retry_after(value) -> float | None:
+    """Retry-After en secondes ("120") ou en date HTTP ; None si absent/illisible."""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, min(float(value), MAX_RETRY_AFTER))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, min(parsedate_to_datetime(value).timestamp() - time.time(), MAX_RETRY_AFTER))
+    except Exception:
+        return None
+
+
+class _HostBucket:
+    def __init__(self, rate: float, burst: float, max_rate: float):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+        self.blocked_until = 0.0
+        self.counters = {"requests": 0, "throttled": 0, "retried": 0, "failed": 0}
+
+
+class RateLimiter:
+    """
+    Limiteur de débit par host (token bucket), partagé par le moteur HTTP et les drivers Selenium.
+
+    - reserve(url) : réserve un jeton et renvoie l'attente nécessaire (thread-safe, non bloquant)
+    - acquire(url) (async) / wait(url) (sync) : attendent leur jeton
+    - AIMD : +increase req/s répartis sur les succès, débit x decrease sur 429/503
+    - plafond : "rate_limit_max", sinon DEFAULT_MAX_FACTOR x le débit de départ du host
+    - Retry-After respecté : le host est gelé jusqu'à l'échéance
+    - compteurs par host : requests, throttled, retried, failed
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        burst: float = DEFAULT_BURST,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_rate: float | None = None,
+        increase: float = 0.5,
+        decrease: float = 0.5,
+        host_rates: dict | None = None,
+    ):
+        self.rate = max(float(min_rate), float(rate))
+        self.burst = max(1.0, float(burst))
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate) if max_rate else None
+        self.increase = float(increase)
+        self.decrease = min(max(float(decrease), 0.05), 0.95)
+        self.host_rates = {str(h).lower(): float(r) for h, r in (host_rates or {}).items()}
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> _HostBucket:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            rate = self.host_rates.get(host, self.rate)
+            max_rate = self.max_rate or rate * DEFAULT_MAX_FACTOR
+            bucket = _HostBucket(rate, self.burst, max(max_rate, rate))
+            self._buckets[host] = bucket
+        return bucket
+
+    # ---------- Jetons ----------
+
+    def reserve(self, url: str) -> float:
+        """Consomme un jeton (éventuellement à crédit) ; renvoie le délai à respecter avant d'envoyer."""
+        with self._lock:
+            b = self._bucket(host_of(url))
+            now = time.monotonic()
+            b.tokens = min(b.burst, b.tokens + (now - b.last) * b.rate)
+            b.last = now
+            b.tokens -= 1
+            b.counters["requests"] += 1
+            delay = -b.tokens / b.rate if b.tokens < 0 else 0.0
+            return max(delay, b.blocked_until - now)
+
+    async def acquire(self, url: str) -> None:
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def wait(self, url: str) -> None:
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    # ---------- Retour d'expérience (AIMD) ----------
+
+    def on_success(self, url: str) -> None:
+        with self._lock:
+            b = self._bucket(host_of(url))
+            # additif : ~+increase req/s par "fenêtre" de rate requêtes réussies
+            b.rate = min(b.max_rate, b.rate + self.increase / max(b.rate, 1.0))
+
+    def on_throttle(self, url: str, retry_after: float | None = None) -> None:
+        with self._lock:
+            b = self._bucket(host_of(url))
+            b.counters["throttled"] += 1
+            b.rate = max(self.min_rate, b.rate * self.decrease)
+            b.tokens = min(b.tokens, 0.0)
+            if retry_after:
+                b.blocked_until = max(b.blocked_until, time.monotonic() + retry_after)
+        print(
+            f"[RATE] {host_of(url)} ralenti à {b.rate:.2f} req/s"
+            + (f" (Retry-After {retry_after:.0f}s)" if retry_after else "")
+        )
+
+    def record_retry(self, url: str) -> None:
+        with self._lock:
+            self._bucket(host_of(url)).counters["retried"] += 1
+
+    def record_failure(self, url: str) -> None:
+        with self._lock:
+            self._bucket(host_of(url)).counters["failed"] += 1
+
+    # ---------- Stats ----------
+
+    def stats(self) -> dict:
+        """{host: {rate, requests, throttled, retried, failed}}"""
+        with self._lock:
+            return {h: {"rate": round(b.rate, 2), **b.counters} for h, b in self._buckets.items()}
+
+    def log_stats(self) -> None:
+        for host, s in sorted(self.stats().items()):
+            print(
+                f"[RATE] {host} : {s['requests']} req, {s['throttled']} throttled, "
+                f"{s['retried']} retried, {s['failed']} failed (débit final {s['rate']} req/s)"
+            )
+
+
+# ==========================
+# LIMITEUR PARTAGÉ (par process)
+# ==========================
+_LIMITER = None
+_LIMITER_LOCK = threading.Lock()
+
+
+def _read_limiter_config() -> dict:
+    config = read_config()
+    return {
+        "rate": float(config.get("rate_limit_default", DEFAULT_RATE) or DEFAULT_RATE),
+        "burst": float(config.get("rate_limit_burst", DEFAULT_BURST) or DEFAULT_BURST),
+        "min_rate": float(config.get("rate_limit_min", DEFAULT_MIN_RATE) or DEFAULT_MIN_RATE),
+        "max_rate": float(config.get("rate_limit_max", 0) or 0) or None,
+        "host_rates": config.get("rate_limits") or {},
+    }
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Limiteur partagé : toutes les requêtes vers un même host (HTTP ou Chrome) passent par lui."""
+    global _LIMITER
+    with _LIMITER_LOCK:
+        if _LIMITER is None:
+            _LIMITER = RateLimiter(**_read_limiter_config())
+        return _LIMITER
+
+
+def close_rate_limiter() -> None:
+    """Fin de run : log des compteurs ; la config (débits par host) est relue au run suivant."""
+    global _LIMITER
+    with _LIMITER_LOCK:
+        limiter, _LIMITER = _LIMITER, None
+    if limiter is not None:
+        limiter.log_stats()
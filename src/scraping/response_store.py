@@ -0,0 +1,260 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional, Dict, Any
+
+
+class ResponseStore:
+    """Archive disque des réponses HTTP (HTML brut), partagée par tous les profils.
+
+    - index SQLite : url -> hash du corps + ETag / Last-Modified + date de fetch
+    - corps compressés (zlib) et adressés par contenu : blobs/<ab>/<sha256>.z
+      (deux URLs au même contenu partagent le même blob)
+    - sert à la revalidation conditionnelle (304) et au mode "replay" hors-ligne
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.blob_dir = os.path.join(root, "blobs")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.db_path = os.path.join(root, "index.sqlite")
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._generation = 0
+        # put (blob puis ligne d'index) et evict (lignes puis blobs orphelins) ne s'entrelacent pas :
+        # sinon evict peut supprimer un blob écrit mais pas encore indexé
+        self._write_lock = threading.Lock()
+        self._init_db()
+
+    def _open(self) -> sqlite3.Connection:
+        # check_same_thread=False : close() ferme depuis le thread principal les connexions des workers
+        con = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA synchronous=NORMAL;")
+        return con
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connexion du thread courant, réutilisée (cf. OfferCache._connect)."""
+        local = self._local
+        con = getattr(local, "con", None)
+        if con is None or getattr(local, "generation", -1) != self._generation:
+            con = self._open()
+            with self._connections_lock:
+                self._connections.append(con)
+                local.con, local.generation = con, self._generation
+        return con
+
+    def close(self) -> None:
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+            self._generation += 1
+        for con in connections:
+            try:
+                con.close()
+            except Exception:
+                pass
+
+    def _init_db(self) -> None:
+        with self._connect() as con:
+            # WAL est persistant dans le fichier : posé une seule fois, à l'ouverture de l'archive
+            con.execute("PRAGMA journal_mode=WAL;")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    url           TEXT PRIMARY KEY,
+                    body_hash     TEXT NOT NULL,
+                    status        INTEGER NOT NULL,
+                    etag          TEXT,
+                    last_modified TEXT,
+                    fetched_at    INTEGER NOT NULL
+                )
+                """
+            )
+            con.execute("CREATE INDEX IF NOT EXISTS idx_responses_fetched ON responses(fetched_at);")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_responses_hash ON responses(body_hash);")
+
+    # ---------- Blobs ----------
+
+    def _blob_path(self, body_hash: str) -> str:
+        return os.path.join(self.blob_dir, body_hash[:2], f"{body_hash}.z")
+
+    def _write_blob(self, body: bytes) -> str:
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(body_hash)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{time.monotonic_ns()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(body, 6))
+            os.replace(tmp, path)
+        return body_hash
+
+    def _read_blob(self, body_hash: str) -> Optional[bytes]:
+        try:
+            with open(self._blob_path(body_hash), "rb") as f:
+                return zlib.decompress(f.read())
+        except Exception:
+            return None
+
+    # ---------- Core API ----------
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """{url, status, etag, last_modified, fetched_at, text} ou None."""
+        if not url:
+            return None
+        with self._connect() as con:
+            row = con.execute(
+                "SELECT url, body_hash, status, etag, last_modified, fetched_at FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        body = self._read_blob(row["body_hash"])
+        if body is None:
+            return None
+        entry = dict(row)
+        entry["text"] = body.decode("utf-8", errors="replace")
+        return entry
+
+    def put(self, url: str, text: str, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        # noms d'en-têtes insensibles à la casse (ETag / Etag / etag)
+        headers = {str(k).lower(): v for k, v in (headers or {}).items()}
+        body = (text or "").encode("utf-8")
+        now = int(time.time())
+        with self._write_lock, self._connect() as con:
+            body_hash = self._write_blob(body)
+            con.execute(
+                """
+                INSERT INTO responses(url, body_hash, status, etag, last_modified, fetched_at)
+                VALUES(?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    body_hash=excluded.body_hash,
+                    status=excluded.status,
+                    etag=excluded.etag,
+                    last_modified=excluded.last_modified,
+                    fetched_at=excluded.fetched_at
+                """,
+                (url, body_hash, int(status), headers.get("etag"), headers.get("last-modified"), now),
+            )
+
+    def touch(self, url: str) -> None:
+        """Réponse 304 : le contenu archivé est toujours valide."""
+        with self._connect() as con:
+            con.execute("UPDATE responses SET fetched_at=? WHERE url=?", (int(time.time()), url))
+
+    @staticmethod
+    def conditional_headers(entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    # ---------- Eviction ----------
+
+    def evict(self, max_age_seconds: int) -> int:
+        """Supprime les entrées plus vieilles que max_age_seconds + les blobs orphelins."""
+        limit = int(time.time()) - int(max_age_seconds)
+        with self._write_lock:
+            with self._connect() as con:
+                cur = con.execute("DELETE FROM responses WHERE fetched_at < ?", (limit,))
+                removed = cur.rowcount or 0
+                alive = {r["body_hash"] for r in con.execute("SELECT DISTINCT body_hash FROM responses")}
+
+            for sub in os.listdir(self.blob_dir):
+                sub_dir = os.path.join(self.blob_dir, sub)
+                if not os.path.isdir(sub_dir):
+                    continue
+                for name in os.listdir(sub_dir):
+                    if name.endswith(".z") and name[:-2] not in alive:
+                        try:
+                            os.remove(os.path.join(sub_dir, name))
+                        except OSError:
+                            pass
+        return removed
+
+
+# ==========================
+# REPLAY HORS-LIGNE
+# ==========================
+REPLAY_STATUSES = ["PENDING_URL", "ERROR_DETAIL", "DETAILED"]
+
+
+def _replay_parser(scraper):
+    """
+    (url de l'offre -> url archivée, parse(entrée archivée) -> dict | None) pour un scraper, ou None :
+    - _parse_detail : HTML de la page de l'offre (ServicePublic, WTTJ, LinkedIn)
+    - _parse_detail_json : réponse JSON de l'API de détail, archivée sous son url (Apec)
+    """
+    if hasattr(scraper, "_parse_detail"):
+        return (lambda url: url), (lambda url, entry: scraper._parse_detail(entry["text"]))
+    if hasattr(scraper, "_parse_detail_json") and hasattr(scraper, "_detail_api_url"):
+        from scraping.http_engine import FetchResult
+
+        return scraper._detail_api_url, (
+            lambda url, entry: scraper._parse_detail_json(FetchResult(url, entry["status"], entry["text"]))
+        )
+    return None
+
+
+def replay_into_cache(cache, store: ResponseStore, statuses=None, limit: int = 100000) -> int:
+    """
+    Re-parse les réponses archivées des offres (sans réseau) et met à jour OfferCache.
+    Utile quand un sélecteur de fetch_detail change : on ré-extrait sans retoucher les sites.
+    Les sources sans parseur rejouable (cf. _replay_parser) sont ignorées et signalées.
+    """
+    from detail_fetcher import SCRAPER_BY_SOURCE, scraper_class
+
+    # snapshot avant mise à jour : une offre repassée en DETAILED ne doit pas être rejouée deux fois
+    offers = []
+    for status in statuses or REPLAY_STATUSES:
+        offers.extend(cache.list_by_status(status, limit=limit, with_description=False))
+
+    parsers = {}
+    replayed = 0
+    updates = []  # écritures groupées par transactions de 500 offres
+
+    for o in offers:
+        source = (o.get("source") or "").lower()
+        url = o.get("url") or ""
+        if not url or source not in SCRAPER_BY_SOURCE:
+            continue
+
+        if source not in parsers:
+            try:
+                parsers[source] = _replay_parser(scraper_class(source)())
+            except Exception as e:
+                print(f"[REPLAY] {source} ignoré : {e}")
+                parsers[source] = None
+            else:
+                if parsers[source] is None:
+                    print(f"[REPLAY] {source} ignoré : pas de parseur pour les réponses archivées.")
+        if parsers[source] is None:
+            continue
+        archived_url, parse = parsers[source]
+
+        key = archived_url(url)
+        entry = store.get(key) if key else None
+        if not entry:
+            continue
+
+        try:
+            d = parse(key, entry)
+        except Exception:
+            d = None
+        if not d or not (d.get("description") or "").strip():
+            continue
+
+        updates.append((o["offer_id"], source, url, d.get("title") or o.get("title") or "", d["description"], "DETAILED"))
+        if len(updates) >= 500:
+            replayed += cache.upsert_details_many(updates)
+            updates = []
+
+    return replayed + cache.upsert_details_many(updates)
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import deque
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.wait import WebDriverWait
+
+
+DEFAULT_BUDGET = 10.0  # tant qu'on n'a pas assez de mesures
+MIN_BUDGET = 2.0
+MAX_BUDGET = 10.0  # jamais plus que les anciennes attentes fixes (10 s au plus)
+MIN_SAMPLES = 10
+PERCENTILE = 0.95
+MARGIN = 1.5
+# timeouts récents : élargissement borné du budget, hors p95 et hors MARGIN
+TIMEOUT_STEP = 0.5
+MAX_TIMEOUT_STEPS = 4
+TIMEOUT_WINDOW = 20
+
+
+class WaitBudget:
+    """
+    Budget d'attente Selenium appris pour une source (ex: "apec_detail").
+
+    - record(seconds) : latence d'une attente réussie (contenu ou marqueur "expirée" apparu)
+    - record_timeout() : attente arrivée au bout du budget (n'entre pas dans le p95)
+    - budget() : p95 des latences réussies x MARGIN, + TIMEOUT_STEP par timeout parmi les
+      TIMEOUT_WINDOW dernières attentes (au plus MAX_TIMEOUT_STEPS), borné à [MIN_BUDGET, MAX_BUDGET]
+    """
+
+    def __init__(self, default: float = DEFAULT_BUDGET, window: int = 200):
+        self.default = float(default)
+        self._samples = deque(maxlen=window)
+        self._outcomes = deque(maxlen=TIMEOUT_WINDOW)  # True = timeout
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(float(seconds))
+            self._outcomes.append(False)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self._outcomes.append(True)
+
+    def budget(self) -> float:
+        with self._lock:
+            samples = sorted(self._samples)
+            timeouts = sum(self._outcomes)
+        if len(samples) < MIN_SAMPLES:
+            return min(MAX_BUDGET, self.default)
+        p = samples[min(len(samples) - 1, int(len(samples) * PERCENTILE))]
+        widen = TIMEOUT_STEP * min(timeouts, MAX_TIMEOUT_STEPS)
+        return min(MAX_BUDGET, max(MIN_BUDGET, p * MARGIN + widen))
+
+
+_BUDGETS = {}
+_BUDGETS_LOCK = threading.Lock()
+
+
+def get_wait_budget(name: str) -> WaitBudget:
+    with _BUDGETS_LOCK:
+        budget = _BUDGETS.get(name)
+        if budget is None:
+            budget = _BUDGETS[name] = WaitBudget()
+        return budget
+
+
+def wait_for_any(driver, budget_name: str, targets: dict, poll: float = 0.1):
+    """
+    Attend le premier des éléments `targets` ({nom: (By, sélecteur)}) présent dans la page.
+    => (nom, élément) dès qu'un des éléments apparaît, (None, None) au bout du budget appris.
+    Une seule attente combinée : une offre expirée ne coûte plus le timeout complet.
+    """
+    budget = get_wait_budget(budget_name)
+    timeout = budget.budget()
+
+    def _first(drv):
+        for name, locator in targets.items():
+            found = drv.find_elements(*locator)
+            if found:
+                return name, found[0]
+        return False
+
+    start = time.monotonic()
+    try:
+        name, element = WebDriverWait(driver, timeout, poll_frequency=poll).until(_first)
+    except TimeoutException:
+        budget.record_timeout()
+        return None, None
+    except Exception:
+        # driver en erreur (session perdue, page plantée) : ni latence ni timeout pour le budget
+        return None, None
+
+    budget.record(time.monotonic() - start)
+    return name, element
@@ -1,23 +1,18 @@
 import time
 import json
+import copy
 import functools
 import os
 import re
 import shutil
+import threading
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from ollama import generate
-from pydantic import BaseModel
+from scraping.config import read_config
 
-
-class Format(BaseModel):
-    response: int
-    justification: str
+# selenium / webdriver_manager, ollama et pydantic sont importés à la première utilisation :
+# l'app (triage des offres) et les pages qui n'en ont pas besoin démarrent sans les charger.
 
 
 def measure_time(func):
@@ -56,15 +51,42 @@ def _purge_wdm_cache():
         print(f"[WDM] Purge cache impossible: {e}")
 
 
-def create_driver():
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920x1080")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-
-    # Retry 1 fois si chromedriver zip corrompu
+# ==========================
+# CHROMEDRIVER (résolu une fois par process)
+# ==========================
+_DRIVER_PATH = None
+_CHROME_OPTIONS = None
+_DRIVER_LOCK = threading.Lock()
+
+
+def _read_driver_config() -> dict:
+    config = read_config()
+    return {
+        # chemin figé du binaire chromedriver (aucun appel à webdriver_manager)
+        "path": (config.get("chromedriver_path") or "").strip(),
+        # mode local : jamais de réseau, chromedriver pris dans la config ou le PATH
+        "offline": bool(config.get("chromedriver_offline", False)),
+        # "lean" (défaut) : ni images / polices / CSS / trackers, chargement "eager" ; "full" : Chrome standard
+        "profile": (config.get("chrome_profile") or "lean").lower(),
+    }
+
+
+# ressources inutiles pour lire du texte (bloquées via CDP en profil "lean")
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css",
+    "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*hotjar.io*", "*segment.io*", "*segment.com*",
+    "*cookielaw.org*", "*onetrust.com*", "*criteo.*", "*bing.com*", "*linkedin.com/px*",
+]
+
+
+def _install_chromedriver() -> str:
+    """webdriver_manager (cache ~/.wdm, réseau possible) avec purge + retry si zip corrompu."""
+    from webdriver_manager.chrome import ChromeDriverManager
+
     last_err = None
     for attempt in range(2):
         try:
@@ -73,8 +95,7 @@ def create_driver():
                 os.chmod(driver_path, 0o755)
             except Exception as e:
                 print(f"Impossible de modifier les permissions de chromedriver.exe : {e}")
-
-            return webdriver.Chrome(service=Service(driver_path), options=options)
+            return driver_path
 
         except Exception as e:
             last_err = e
@@ -87,6 +108,93 @@ def create_driver():
                 continue
             break
 
+    raise RuntimeError(f"Impossible d'installer chromedriver: {last_err}")
+
+
+def resolve_chromedriver(force: bool = False) -> str:
+    """
+    Chemin du chromedriver, résolu une seule fois par process :
+    chemin figé en config > mode local (PATH) > webdriver_manager.
+    """
+    global _DRIVER_PATH
+    with _DRIVER_LOCK:
+        if _DRIVER_PATH and not force and os.path.exists(_DRIVER_PATH):
+            return _DRIVER_PATH
+
+        cfg = _read_driver_config()
+        if cfg["path"]:
+            if not os.path.exists(cfg["path"]):
+                raise RuntimeError(f"chromedriver_path introuvable : {cfg['path']}")
+            driver_path = cfg["path"]
+        elif cfg["offline"]:
+            driver_path = shutil.which("chromedriver") or ""
+            if not driver_path:
+                raise RuntimeError("chromedriver_offline : aucun chromedriver dans le PATH ni chromedriver_path.")
+        else:
+            driver_path = _install_chromedriver()
+
+        _DRIVER_PATH = driver_path
+        print(f"[DRIVERS] chromedriver : {driver_path}")
+        return driver_path
+
+
+def _chrome_options():
+    """Options Chrome construites une fois, copiées pour chaque driver."""
+    global _CHROME_OPTIONS
+    with _DRIVER_LOCK:
+        if _CHROME_OPTIONS is None:
+            from selenium.webdriver.chrome.options import Options
+
+            options = Options()
+            options.add_argument("--headless=new")
+            options.add_argument("--disable-gpu")
+            options.add_argument("--window-size=1920x1080")
+            options.add_argument("--no-sandbox")
+            options.add_argument("--disable-dev-shm-usage")
+
+            if _read_driver_config()["profile"] == "lean":
+                # DOM prêt suffit : on ne lit que du texte (h1, descriptions)
+                options.page_load_strategy = "eager"
+                options.add_argument("--blink-settings=imagesEnabled=false")
+                options.add_experimental_option(
+                    "prefs", {"profile.managed_default_content_settings.images": 2}
+                )
+            _CHROME_OPTIONS = options
+        return copy.deepcopy(_CHROME_OPTIONS)
+
+
+def _block_resources(driver) -> None:
+    """Profil lean : feuilles de style, polices, médias et trackers ne sont jamais téléchargés."""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+    except Exception as e:
+        print(f"[DRIVERS] Blocage des ressources indisponible : {e}")
+
+
+def create_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = _chrome_options()
+
+    # Retry 1 fois en re-résolvant le driver (binaire supprimé / cache corrompu entre-temps)
+    last_err = None
+    for attempt in range(2):
+        try:
+            driver_path = resolve_chromedriver(force=attempt > 0)
+            driver = webdriver.Chrome(service=Service(driver_path), options=options)
+            if options.page_load_strategy == "eager":
+                _block_resources(driver)
+            return driver
+        except Exception as e:
+            last_err = e
+            msg = str(e)
+            if attempt == 0 and ("BadZipFile" in msg or "not a zip" in msg or not os.path.exists(_DRIVER_PATH or "")):
+                print("[DRIVERS] chromedriver inutilisable, nouvelle résolution…")
+                continue
+            break
+
     raise RuntimeError(f"Impossible de créer le driver Chrome: {last_err}")
 
 
@@ -94,6 +202,29 @@ def create_driver():
 LOCAL_LLM_AVAILABLE = True
 SCORE_THRESHOLD = 65  # seuil d'acceptation de l'offre
 
+_SCORE_FORMAT = None
+
+
+def _score_format():
+    """Modèle pydantic de la réponse de scoring (ChatGPT), construit au premier appel."""
+    global _SCORE_FORMAT
+    if _SCORE_FORMAT is None:
+        from pydantic import BaseModel
+
+        class Format(BaseModel):
+            response: int
+            justification: str
+
+        _SCORE_FORMAT = Format
+    return _SCORE_FORMAT
+
+
+def generate(**kwargs):
+    """ollama.generate, importé au premier appel au LLM local."""
+    from ollama import generate as ollama_generate
+
+    return ollama_generate(**kwargs)
+
 
 def _ensure_llm_row(row: dict) -> dict:
     """Normalise les clés attendues par le scoring."""
@@ -197,7 +328,7 @@ def add_LLM_comment(client_LLM, llm_config, row):
                     instructions=llm_config["prompt_score"],
                     temperature=0.1,
                     input=str(row.get("company", "")) + "\n" + str(row.get("title", "")) + "\n" + str(row.get("content", "")),
-                    text_format=Format,
+                    text_format=_score_format(),
                 )
                 json_output = _extract_json_object(response.output_text)
                 score = int(float(json_output.get("reponse", 0)))
@@ -430,26 +561,36 @@ def compute_offer_workers(total_offers: int, io_bound: bool = True) -> int:
     return workers
 
 
-def parallel_map_offers(jobs, func, io_bound: bool = True):
+def iter_map_offers(jobs, func, io_bound: bool = True, max_workers: int | None = None):
+    """Comme parallel_map_offers, mais génère les résultats (non None) dès qu'ils sont prêts."""
     if not jobs:
-        return []
+        return
 
-    max_workers = compute_offer_workers(len(jobs), io_bound=io_bound)
+    workers_cap = compute_offer_workers(len(jobs), io_bound=io_bound)
+    # max_workers : plafond imposé par une ressource bornée (ex: pool de drivers Selenium)
+    max_workers = min(workers_cap, max_workers) if max_workers else workers_cap
     print(f"[SCRAP] Récupération détails en parallèle ({max_workers} workers, {len(jobs)} offres)")
-    results = []
 
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
         future_to_job = {executor.submit(func, job): job for job in jobs}
-        for future in as_completed(future_to_job):
-            job = future_to_job[future]
-            try:
-                result = future.result()
+        try:
+            for future in as_completed(future_to_job):
+                job = future_to_job[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"[SCRAP] Erreur sur job {job}: {e}")
+                    continue
                 if result is not None:
-                    results.append(result)
-            except Exception as e:
-                print(f"[SCRAP] Erreur sur job {job}: {e}")
+                    yield result
+        finally:
+            # consommateur arrêté en cours de route : on n'attend que les jobs déjà lancés
+            for future in future_to_job:
+                future.cancel()
 
-    return results
+
+def parallel_map_offers(jobs, func, io_bound: bool = True, max_workers: int | None = None):
+    return list(iter_map_offers(jobs, func, io_bound=io_bound, max_workers=max_workers))
 
 
 def load_id_sets_for_platform(config_path: str, csv_path: str, platform_key: str):
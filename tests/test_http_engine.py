@@ -0,0 +1,142 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+from aiohttp import web
+
+from scraping.http_engine import HttpEngine
+from scraping.rate_limiter import RateLimiter
+from scraping.response_store import ResponseStore
+
+
+class LocalServer:
+    """Serveur aiohttp local (thread dédié) : routes par test, compteur de requêtes par chemin."""
+
+    def __init__(self):
+        self.hits = {}
+        self.request_headers = {}
+        self.app = web.Application()
+        self.app.router.add_route("GET", "/{name}", self._dispatch)
+        self.handlers = {}
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = None
+        self.port = None
+
+    async def _dispatch(self, request):
+        name = request.match_info["name"]
+        self.hits[name] = self.hits.get(name, 0) + 1
+        self.request_headers.setdefault(name, []).append(dict(request.headers))
+        return self.handlers[name](request, self.hits[name])
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(timeout=5)
+        return self
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+    def url(self, name: str) -> str:
+        return f"http://127.0.0.1:{self.port}/{name}"
+
+
+@pytest.fixture
+def server():
+    srv = LocalServer().start()
+    yield srv
+    srv.stop()
+
+
+@pytest.fixture
+def make_engine():
+    engines = []
+
+    def _make(**kwargs):
+        kwargs.setdefault("limiter", RateLimiter(rate=1000, burst=1000))
+        kwargs.setdefault("backoff_base", 0.01)
+        engine = HttpEngine(**kwargs)
+        engines.append(engine)
+        return engine
+
+    yield _make
+    for engine in engines:
+        engine.close()
+
+
+def test_throttled_response_is_retried_after_retry_after(server, make_engine):
+    def handler(request, hit):
+        if hit == 1:
+            return web.Response(status=429, headers={"Retry-After": "0"})
+        return web.Response(text="ok")
+
+    server.handlers["busy"] = handler
+    engine = make_engine()
+
+    res = engine.fetch(server.url("busy"))
+
+    assert res.ok and res.text == "ok"
+    assert server.hits["busy"] == 2
+    stats = engine.limiter.stats()[f"127.0.0.1:{server.port}"]
+    assert stats["throttled"] == 1 and stats["retried"] == 1 and stats["failed"] == 0
+
+
+def test_not_modified_is_served_from_the_store(server, make_engine, tmp_path):
+    def handler(request, hit):
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.Response(text="corps v1", headers={"ETag": '"v1"'})
+
+    server.handlers["page"] = handler
+    engine = make_engine(store=ResponseStore(str(tmp_path / "http_cache")))
+
+    first = engine.fetch(server.url("page"))
+    second = engine.fetch(server.url("page"))
+
+    assert first.ok and not first.from_cache
+    assert second.from_cache and second.status_code == 200 and second.text == "corps v1"
+    assert server.request_headers["page"][1].get("If-None-Match") == '"v1"'
+
+
+def test_response_over_max_bytes_is_rejected(server, make_engine):
+    server.handlers["big"] = lambda request, hit: web.Response(text="x" * 5000)
+    engine = make_engine(max_response_bytes=1000)
+
+    res = engine.fetch(server.url("big"))
+
+    assert not res.ok
+    assert "1000 octets" in res.error
+
+
+def test_unknown_charset_falls_back_to_utf8(server, make_engine):
+    server.handlers["charset"] = lambda request, hit: web.Response(
+        body="héllo".encode("utf-8"), headers={"Content-Type": "text/html; charset=x-unknown"}
+    )
+    engine = make_engine()
+
+    res = engine.fetch(server.url("charset"))
+
+    assert res.ok and res.text == "héllo"
+
+
+def test_connection_refused_returns_an_error_result(make_engine):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    engine = make_engine(retries=2)
+
+    res = engine.fetch(f"http://127.0.0.1:{port}/closed")
+
+    assert not res.ok and res.status_code == 0
+    assert "ClientConnectorError" in res.error
+    assert engine.limiter.stats()[f"127.0.0.1:{port}"]["failed"] == 1
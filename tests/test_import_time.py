@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# dépendances lourdes importées à la première utilisation (scraping / LLM), jamais au démarrage de l'app
+HEAVY_MODULES = ["selenium", "webdriver_manager", "ollama", "openai", "mistralai", "aiohttp", "bs4", "lxml"]
+# borne large : streamlit + pandas seuls prennent ~1 s, les scrapers et SDK LLM en ajoutaient plusieurs
+MAX_IMPORT_SECONDS = 15.0
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import application.all_pages_app
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def _import_app() -> dict:
+    # process neuf : aucun module déjà chargé par pytest ou un autre test
+    env = {**os.environ, "PYTHONPATH": SRC_DIR}
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_app_import_does_not_load_heavy_dependencies():
+    result = _import_app()
+    assert result["loaded"] == []
+    assert result["elapsed"] < MAX_IMPORT_SECONDS